@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Fake GitHub Server
+
+A local stand-in for api.github.com and github.com, used to benchmark the
+OAuth proxy without touching the real API or spending real rate limit.
+
+It serves the endpoints the proxy and the frontend use:
+
+    POST /login/oauth/access_token                              token exchange
+    GET  /user                                                  authenticated user
+    GET  /repos/{owner}/{repo}                                  a repository, with permissions
+    POST /repos/{owner}/{repo}/actions/workflows/{id}/dispatches   workflow dispatch (204)
+    GET  /repos/{owner}/{repo}/actions/workflows/{id}/runs      recent runs of a workflow
+    GET  /repos/{owner}/{repo}/actions/runs/{run_id}            a single run
+    GET  /repos/{owner}/{repo}/actions/runs/{run_id}/artifacts  artifacts of a run
+    GET  /repos/{owner}/{repo}/actions/artifacts/{id}           an artifact
+    GET  /repos/{owner}/{repo}/actions/artifacts/{id}/zip       302 to a blob URL
+    GET  /_blobs/{id}                                           artifact zip
+
+Runs move from queued to in_progress to completed as time passes. JSON
+responses carry an ETag, answer If-None-Match with 304 and are gzipped for
+clients that accept it. Run lists are paginated with page/per_page and a
+Link header. Every API response carries X-RateLimit-* headers
+tracked per token, and a token that has used up its quota gets 403 until
+the window resets, like on GitHub.
+
+Usage:
+    python benchmarks/fake_github_server.py --port 9100 --latency 50 --jitter 20
+"""
+
+import argparse
+import gzip
+import hashlib
+import http.server
+import io
+import json
+import random
+import re
+import socketserver
+import threading
+import time
+import urllib.parse
+import zipfile
+
+RUN_PATH = re.compile(r'^/repos/([^/]+)/([^/]+)/actions/runs/(\d+)$')
+RUN_ARTIFACTS_PATH = re.compile(r'^/repos/([^/]+)/([^/]+)/actions/runs/(\d+)/artifacts$')
+WORKFLOW_RUNS_PATH = re.compile(r'^/repos/([^/]+)/([^/]+)/actions/workflows/([^/]+)/runs$')
+DISPATCH_PATH = re.compile(r'^/repos/([^/]+)/([^/]+)/actions/workflows/([^/]+)/dispatches$')
+ARTIFACT_PATH = re.compile(r'^/repos/([^/]+)/([^/]+)/actions/artifacts/(\d+)$')
+ARTIFACT_ZIP_PATH = re.compile(r'^/repos/([^/]+)/([^/]+)/actions/artifacts/(\d+)/zip$')
+BLOB_PATH = re.compile(r'^/_blobs/(\d+)$')
+REPO_PATH = re.compile(r'^/repos/([^/]+)/([^/]+)$')
+
+BLOB_CHUNK_SIZE = 64 * 1024
+
+def build_artifact(size):
+    """A zip like GetResourceGroups.yml uploads, padded to roughly size bytes"""
+    resource_groups = [{'name': f'rg-bench-{i:03d}', 'location': 'eastus'} for i in range(50)]
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('resource-groups.json', json.dumps(resource_groups, indent=2))
+        padding = max(0, size - 4096)
+        if padding:
+            archive.writestr(zipfile.ZipInfo('padding.bin'), random.randbytes(padding), zipfile.ZIP_STORED)
+    return buffer.getvalue()
+
+class FakeGitHub:
+    """State shared by all requests: runs, per-token quotas and settings"""
+    def __init__(self, latency=0.0, jitter=0.0, rate_limit=5000, rate_window=3600,
+                 run_duration=30.0, artifact_size=8 * 1024 * 1024):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.run_duration = run_duration
+        self.artifact_size = artifact_size
+        self.lock = threading.Lock()
+        self.runs = {}  # run id -> (creation time, run name)
+        self.next_run_id = 1000
+        self.quotas = {}  # token -> [used, reset epoch]
+        self.stats = {'requests': 0, 'not_modified': 0, 'rate_limited': 0, 'dispatches': 0}
+        self.artifact = build_artifact(artifact_size)
+
+    def delay(self):
+        """Sleep for the configured upstream latency"""
+        seconds = self.latency + random.uniform(-self.jitter, self.jitter)
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def charge(self, token):
+        """Count one API call against a token, returning its rate-limit headers and whether it is allowed"""
+        now = time.time()
+        with self.lock:
+            self.stats['requests'] += 1
+            quota = self.quotas.get(token)
+            if quota is None or now >= quota[1]:
+                quota = self.quotas[token] = [0, int(now + self.rate_window)]
+            allowed = quota[0] < self.rate_limit
+            if allowed:
+                quota[0] += 1
+            else:
+                self.stats['rate_limited'] += 1
+            used, reset = quota
+        headers = {
+            'X-RateLimit-Limit': str(self.rate_limit),
+            'X-RateLimit-Remaining': str(max(0, self.rate_limit - used)),
+            'X-RateLimit-Used': str(used),
+            'X-RateLimit-Reset': str(reset),
+            'X-RateLimit-Resource': 'core',
+        }
+        return headers, allowed
+
+    def create_run(self, inputs):
+        """Record a dispatched run and return its id"""
+        title = ' '.join(['Deploy'] + [str(value) for value in inputs.values() if value])
+        with self.lock:
+            self.next_run_id += 1
+            self.runs[self.next_run_id] = (time.time(), title)
+            self.stats['dispatches'] += 1
+            return self.next_run_id
+
+    def run(self, owner, repo, run_id):
+        """Describe a run, advancing its status with its age"""
+        with self.lock:
+            created, title = self.runs.setdefault(run_id, (time.time(), 'Deploy'))
+        age = time.time() - created
+        if age < 2:
+            status, conclusion = 'queued', None
+        elif age < self.run_duration:
+            status, conclusion = 'in_progress', None
+        else:
+            status, conclusion = 'completed', 'success'
+        created_at = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(created))
+        return {
+            'id': run_id,
+            'name': 'Deploy',
+            'display_title': title,
+            'run_number': run_id - 1000,
+            'event': 'workflow_dispatch',
+            'status': status,
+            'conclusion': conclusion,
+            'head_branch': 'main',
+            'created_at': created_at,
+            'updated_at': created_at,
+            'html_url': f'https://github.com/{owner}/{repo}/actions/runs/{run_id}',
+            'jobs_url': f'https://api.github.com/repos/{owner}/{repo}/actions/runs/{run_id}/jobs',
+        }
+
+    def recent_runs(self, owner, repo, per_page, page=1):
+        """A page of the dispatched runs, newest first, and the total number of runs"""
+        with self.lock:
+            run_ids = sorted(self.runs, reverse=True)
+        start = (page - 1) * per_page
+        return [self.run(owner, repo, run_id) for run_id in run_ids[start:start + per_page]], len(run_ids)
+
+class FakeGitHubHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    @property
+    def github(self):
+        return self.server.github
+
+    def do_GET(self):
+        path, _, query = self.path.partition('?')
+
+        blob = BLOB_PATH.match(path)
+        if blob:
+            self.send_blob()
+            return
+
+        if not self.check_rate_limit():
+            return
+
+        if path == '/user':
+            self.rate_limit_headers['X-OAuth-Scopes'] = 'repo, workflow'
+            self.send_json(200, {'login': 'octocat', 'id': 1, 'type': 'User'})
+            return
+
+        match = REPO_PATH.match(path)
+        if match:
+            owner, repo = match.groups()
+            self.send_json(200, {'id': 1, 'name': repo, 'full_name': f'{owner}/{repo}', 'private': True,
+                                 'permissions': {'admin': False, 'push': True, 'pull': True}})
+            return
+
+        match = RUN_PATH.match(path)
+        if match:
+            owner, repo, run_id = match.groups()
+            self.send_json(200, self.github.run(owner, repo, int(run_id)))
+            return
+
+        match = RUN_ARTIFACTS_PATH.match(path)
+        if match:
+            self.send_json(200, {'total_count': 1, 'artifacts': [self.artifact(int(match.group(3)))]})
+            return
+
+        match = ARTIFACT_PATH.match(path)
+        if match:
+            self.send_json(200, self.artifact(int(match.group(3))))
+            return
+
+        match = WORKFLOW_RUNS_PATH.match(path)
+        if match:
+            owner, repo, _ = match.groups()
+            params = urllib.parse.parse_qs(query)
+            per_page = int(params.get('per_page', ['30'])[0])
+            page = int(params.get('page', ['1'])[0])
+            runs, total = self.github.recent_runs(owner, repo, per_page, page)
+            self.send_json(200, {'total_count': total, 'workflow_runs': runs},
+                           links=self.page_links(path, per_page, page, total))
+            return
+
+        match = ARTIFACT_ZIP_PATH.match(path)
+        if match:
+            host = self.headers.get('Host', f'127.0.0.1:{self.server.server_address[1]}')
+            self.send_response(302)
+            self.send_header('Location', f'http://{host}/_blobs/{match.group(3)}?sig=benchmark')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        self.send_json(404, {'message': 'Not Found'})
+
+    def do_POST(self):
+        path = self.path.partition('?')[0]
+        content_length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(content_length) if content_length else b''
+
+        if path == '/login/oauth/access_token':
+            self.github.delay()
+            code = urllib.parse.parse_qs(body.decode('utf-8')).get('code', [''])[0]
+            token = 'gho_' + hashlib.sha256(code.encode()).hexdigest()[:36]
+            self.send_json(200, {'access_token': token, 'token_type': 'bearer', 'scope': 'workflow'},
+                           etag=False)
+            return
+
+        if not self.check_rate_limit():
+            return
+
+        if DISPATCH_PATH.match(path):
+            try:
+                inputs = json.loads(body or b'{}').get('inputs') or {}
+            except ValueError:
+                inputs = {}
+            self.github.create_run(inputs)
+            self.send_response(204)
+            self.send_rate_limit_headers()
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        self.send_json(404, {'message': 'Not Found'})
+
+    def artifact(self, artifact_id):
+        return {
+            'id': artifact_id,
+            'name': 'azure-resource-groups',
+            'size_in_bytes': len(self.github.artifact),
+            'expired': False,
+        }
+
+    def check_rate_limit(self):
+        """Delay and charge the request, answering 403 if the token's quota is used up"""
+        self.github.delay()
+        self.rate_limit_headers, allowed = self.github.charge(self.headers.get('Authorization', ''))
+        if not allowed:
+            self.send_json(403, {'message': 'API rate limit exceeded'}, etag=False)
+        return allowed
+
+    def send_rate_limit_headers(self):
+        for name, value in getattr(self, 'rate_limit_headers', {}).items():
+            self.send_header(name, value)
+
+    def page_links(self, path, per_page, page, total):
+        """A Link header value like GitHub's for a page of a list, or None for a single page"""
+        last = max(1, -(-total // per_page))
+        host = self.headers.get('Host', f'127.0.0.1:{self.server.server_address[1]}')
+        url = f'http://{host}{path}?per_page={per_page}&page='
+        links = []
+        if page > 1:
+            links += [f'<{url}{page - 1}>; rel="prev"', f'<{url}1>; rel="first"']
+        if page < last:
+            links += [f'<{url}{page + 1}>; rel="next"', f'<{url}{last}>; rel="last"']
+        return ', '.join(links) or None
+
+    def send_json(self, status, data, etag=True, links=None):
+        """Send a JSON body, or 304 if the client already holds it"""
+        body = json.dumps(data).encode('utf-8')
+        tag = f'W/"{hashlib.md5(body).hexdigest()}"' if etag and status == 200 else None
+        if tag and self.headers.get('If-None-Match') == tag:
+            with self.github.lock:
+                self.github.stats['not_modified'] += 1
+            self.send_response(304)
+            self.send_rate_limit_headers()
+            self.send_header('ETag', tag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(status)
+        self.send_rate_limit_headers()
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        if links:
+            self.send_header('Link', links)
+        if tag:
+            self.send_header('ETag', tag)
+        # Like GitHub, gzip anything but tiny bodies for clients that ask
+        if 'gzip' in self.headers.get('Accept-Encoding', '') and len(body) > 512:
+            body = gzip.compress(body)
+            self.send_header('Content-Encoding', 'gzip')
+            self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_blob(self):
+        """Stream the artifact zip in chunks"""
+        artifact = memoryview(self.github.artifact)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/zip')
+        self.send_header('Content-Length', str(len(artifact)))
+        self.end_headers()
+        for offset in range(0, len(artifact), BLOB_CHUNK_SIZE):
+            self.wfile.write(artifact[offset:offset + BLOB_CHUNK_SIZE])
+
+    def log_message(self, format, *args):
+        pass
+
+class FakeGitHubServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 256
+
+    def __init__(self, address, github):
+        super().__init__(address, FakeGitHubHandler)
+        self.github = github
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stand-in for the GitHub API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9100)
+    parser.add_argument('--latency', type=float, default=50, help='mean upstream latency in ms (default: 50)')
+    parser.add_argument('--jitter', type=float, default=10, help='latency jitter in ms (default: 10)')
+    parser.add_argument('--rate-limit', type=int, default=5000, help='API calls per token per window (default: 5000)')
+    parser.add_argument('--rate-window', type=int, default=3600, help='rate-limit window in seconds (default: 3600)')
+    parser.add_argument('--run-duration', type=float, default=30, help='seconds until a run completes (default: 30)')
+    parser.add_argument('--artifact-size', type=int, default=8 * 1024 * 1024,
+                        help='artifact download size in bytes (default: 8 MiB)')
+    args = parser.parse_args()
+
+    github = FakeGitHub(latency=args.latency / 1000, jitter=args.jitter / 1000,
+                        rate_limit=args.rate_limit, rate_window=args.rate_window,
+                        run_duration=args.run_duration, artifact_size=args.artifact_size)
+    with FakeGitHubServer((args.host, args.port), github) as server:
+        print(f"Fake GitHub listening on http://{args.host}:{args.port}", flush=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        print(json.dumps(github.stats), flush=True)
+
+if __name__ == '__main__':
+    main()
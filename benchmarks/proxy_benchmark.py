@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+OAuth Proxy Benchmark
+
+Starts the fake GitHub server and the OAuth proxy (pointed at it through
+GITHUB_API_URL / GITHUB_URL), drives the proxy with a weighted mix of the
+requests the frontend makes, and reports throughput, p50/p99 latency and
+the proxy's resident memory.
+
+Scenarios:
+    poll      GET a workflow run, or the workflow's recent runs, as the
+              frontend does while waiting for a run to finish
+    dispatch  POST a workflow_dispatch
+    artifact  download a run artifact (302 to a blob, streamed)
+    oauth     GET /oauth/callback, which exchanges a code for a token
+    preflight OPTIONS before an Authorization-bearing fetch, as the browser sends
+    session   the token check a page load makes: /auth/check, or /api/user and
+              the repository against a proxy without it
+
+Usage:
+    python benchmarks/proxy_benchmark.py --duration 30 --concurrency 16
+    python benchmarks/proxy_benchmark.py --mix poll=90,artifact=10 --latency 100
+    python benchmarks/proxy_benchmark.py --json after.json --baseline before.json
+
+Extra proxy configuration is passed with --proxy-env NAME=VALUE, e.g.
+--proxy-env WORKER_THREADS=64. Results can be written with --json and
+compared against an earlier run with --baseline.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+DEFAULT_SCRIPT = os.path.join(REPO_DIR, 'oauth-proxy-server-production.py')
+FAKE_GITHUB_SCRIPT = os.path.join(BENCHMARK_DIR, 'fake_github_server.py')
+
+DEFAULT_MIX = 'poll=80,dispatch=8,artifact=4,oauth=8'
+OWNER, REPO, WORKFLOW = 'bench-owner', 'bench-repo', 'root.yml'
+
+class ProxyClient:
+    """One simulated browser: a keep-alive connection (when the proxy allows it) and a token"""
+    def __init__(self, host, port, token, run_ids):
+        self.host = host
+        self.port = port
+        self.token = token
+        self.run_ids = run_ids
+        self.connection = None
+
+    def request(self, method, path, body=None, headers=None):
+        """Send a request and read the whole response, returning (status, bytes on the wire)"""
+        headers = dict(headers or {})
+        headers.setdefault('Origin', 'http://localhost:8000')
+        headers.setdefault('Accept-Encoding', 'gzip, deflate, br')  # what browsers send
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            try:
+                self.connection.request(method, path, body=body, headers=headers)
+                response = self.connection.getresponse()
+                size = 0
+                while True:
+                    chunk = response.read(64 * 1024)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+            except (ConnectionError, http.client.BadStatusLine, http.client.RemoteDisconnected):
+                self.close()
+                if attempt == 0:
+                    continue
+                raise
+            if response.will_close:
+                self.close()
+            return response.status, size
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def auth(self):
+        return {'Authorization': f'token {self.token}'}
+
+    def poll(self):
+        if random.random() < 0.8:
+            path = f'/api/repos/{OWNER}/{REPO}/actions/runs/{random.choice(self.run_ids)}'
+        else:
+            path = f'/api/repos/{OWNER}/{REPO}/actions/workflows/{WORKFLOW}/runs?per_page=10'
+        return self.request('GET', path, headers=self.auth()), (200,)
+
+    def dispatch(self):
+        body = json.dumps({'ref': 'main', 'inputs': {'region': 'eastus', 'size': 'small'}}).encode()
+        headers = dict(self.auth(), **{'Content-Type': 'application/json'})
+        path = f'/api/repos/{OWNER}/{REPO}/actions/workflows/{WORKFLOW}/dispatches'
+        return self.request('POST', path, body=body, headers=headers), (204,)
+
+    def artifact(self):
+        path = f'/api/repos/{OWNER}/{REPO}/actions/artifacts/{random.choice(self.run_ids)}/zip'
+        return self.request('GET', path, headers=self.auth()), (200,)
+
+    def preflight(self):
+        headers = {'Access-Control-Request-Method': 'GET',
+                   'Access-Control-Request-Headers': 'authorization'}
+        path = f'/api/repos/{OWNER}/{REPO}/actions/runs/{random.choice(self.run_ids)}'
+        return self.request('OPTIONS', path, headers=headers), (200, 204)
+
+    def session(self):
+        status, size = self.request('GET', f'/auth/check?repo={OWNER}/{REPO}', headers=self.auth())
+        if status != 404:
+            return (status, size), (200,)
+        status, size = self.request('GET', '/api/user', headers=self.auth())
+        more, more_size = self.request('GET', f'/api/repos/{OWNER}/{REPO}', headers=self.auth())
+        return (more if status == 200 else status, size + more_size), (200,)
+
+    def oauth(self):
+        path = f'/oauth/callback?code={random.getrandbits(64):016x}&state=benchmark'
+        return self.request('GET', path), (200,)
+
+class Recorder:
+    """Latency samples and error counts per scenario"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+        self.bytes = 0
+
+    def record(self, scenario, seconds, ok, size=0):
+        with self.lock:
+            self.latencies.setdefault(scenario, []).append(seconds)
+            if not ok:
+                self.errors[scenario] = self.errors.get(scenario, 0) + 1
+            self.bytes += size
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))]
+
+def read_memory(pid):
+    """Current and peak resident set size in bytes of a process and its pre-forked workers, from /proc"""
+    values = {}
+    pids = [pid]
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as children:
+            pids += [int(child) for child in children.read().split()]
+    except OSError:
+        pass
+    for each in pids:
+        try:
+            with open(f'/proc/{each}/status') as status:
+                for line in status:
+                    name, _, value = line.partition(':')
+                    if name in ('VmRSS', 'VmHWM'):
+                        values[name] = values.get(name, 0) + int(value.split()[0]) * 1024
+        except OSError:
+            pass
+    return values.get('VmRSS'), values.get('VmHWM')
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def wait_for_port(port, process, timeout=15):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'{process.args[1]} exited with status {process.returncode}')
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'nothing listening on port {port} after {timeout}s')
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in ('poll', 'dispatch', 'artifact', 'oauth', 'preflight', 'session'):
+            raise SystemExit(f'unknown scenario in --mix: {name}')
+        mix[name] = float(weight or 1)
+    return mix
+
+def run_workload(args, proxy_port, proxy_pid):
+    """Drive the proxy for the warm-up and measured periods and return the report"""
+    mix = parse_mix(args.mix)
+    scenarios, weights = list(mix), list(mix.values())
+    run_ids = [1001 + i for i in range(args.runs)]
+    recorder = Recorder()
+    measuring = threading.Event()
+    stop = threading.Event()
+
+    def client_loop(index):
+        client = ProxyClient('127.0.0.1', proxy_port, f'gho_bench{index % args.tokens:04d}', run_ids)
+        while not stop.is_set():
+            scenario = random.choices(scenarios, weights)[0]
+            started = time.perf_counter()
+            try:
+                (status, size), expected = getattr(client, scenario)()
+                ok = status in expected
+            except Exception:
+                size, ok = 0, False
+            if measuring.is_set():
+                recorder.record(scenario, time.perf_counter() - started, ok, size)
+        client.close()
+
+    threads = [threading.Thread(target=client_loop, args=(i,), daemon=True) for i in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+
+    time.sleep(args.warmup)
+    measuring.set()
+    started = time.perf_counter()
+    peak_rss = 0
+    while time.perf_counter() - started < args.duration:
+        time.sleep(min(0.5, args.duration))
+        rss, _ = read_memory(proxy_pid)
+        peak_rss = max(peak_rss, rss or 0)
+    measuring.clear()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=60)
+
+    rss, hwm = read_memory(proxy_pid)
+    report = {
+        'config': {
+            'duration': args.duration,
+            'concurrency': args.concurrency,
+            'mix': mix,
+            'latency_ms': args.latency,
+            'artifact_size': args.artifact_size,
+            'proxy_env': args.proxy_env,
+        },
+        'scenarios': {},
+        'memory': {'rss': rss, 'peak_rss_sampled': peak_rss, 'peak_rss': hwm},
+        'bytes_received': recorder.bytes,
+    }
+    all_latencies = []
+    for scenario, latencies in sorted(recorder.latencies.items()):
+        latencies.sort()
+        all_latencies.extend(latencies)
+        report['scenarios'][scenario] = summarize(latencies, recorder.errors.get(scenario, 0), elapsed)
+    all_latencies.sort()
+    report['total'] = summarize(all_latencies, sum(recorder.errors.values()), elapsed)
+    return report
+
+def summarize(latencies, errors, elapsed):
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'max_ms': (latencies[-1] if latencies else 0.0) * 1000,
+    }
+
+def print_report(report, baseline=None):
+    def delta(current, previous):
+        if not previous:
+            return ''
+        return f' ({(current - previous) / previous * 100:+.1f}%)'
+
+    print()
+    print(f"{'scenario':<10} {'requests':>9} {'errors':>7} {'req/s':>18} {'p50 ms':>18} {'p99 ms':>18} {'max ms':>9}")
+    rows = list(report['scenarios'].items()) + [('total', report['total'])]
+    for name, row in rows:
+        before = (baseline or {}).get('scenarios', {}).get(name) if name != 'total' else (baseline or {}).get('total')
+        before = before or {}
+        throughput = f"{row['throughput']:.1f}{delta(row['throughput'], before.get('throughput'))}"
+        p50 = f"{row['p50_ms']:.1f}{delta(row['p50_ms'], before.get('p50_ms'))}"
+        p99 = f"{row['p99_ms']:.1f}{delta(row['p99_ms'], before.get('p99_ms'))}"
+        print(f"{name:<10} {row['requests']:>9} {row['errors']:>7} {throughput:>18} {p50:>18} {p99:>18} {row['max_ms']:>9.1f}")
+
+    received = report['bytes_received']
+    print(f"\nbody bytes received: {received / 2**20:.1f} MiB"
+          f"{delta(received, (baseline or {}).get('bytes_received'))}")
+
+    memory = report['memory']
+    previous = (baseline or {}).get('memory', {})
+    if memory['rss'] is not None:
+        print()
+        print(f"proxy RSS at end: {memory['rss'] / 2**20:.1f} MiB{delta(memory['rss'], previous.get('rss'))}, "
+              f"peak: {memory['peak_rss'] / 2**20:.1f} MiB{delta(memory['peak_rss'], previous.get('peak_rss'))}")
+    else:
+        print("\nproxy RSS unavailable (no /proc on this platform)")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the OAuth proxy against a local fake GitHub')
+    parser.add_argument('--script', default=DEFAULT_SCRIPT, help='proxy script to run; it must listen on $PORT (default: production server)')
+    parser.add_argument('--duration', type=float, default=30, help='measured seconds (default: 30)')
+    parser.add_argument('--warmup', type=float, default=3, help='unmeasured seconds before measuring (default: 3)')
+    parser.add_argument('--concurrency', type=int, default=16, help='simulated clients (default: 16)')
+    parser.add_argument('--tokens', type=int, default=4, help='distinct GitHub tokens used by the clients (default: 4)')
+    parser.add_argument('--runs', type=int, default=8, help='distinct workflow runs polled (default: 8)')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'scenario weights (default: {DEFAULT_MIX})')
+    parser.add_argument('--latency', type=float, default=50, help='fake GitHub latency in ms (default: 50)')
+    parser.add_argument('--jitter', type=float, default=10, help='fake GitHub latency jitter in ms (default: 10)')
+    parser.add_argument('--rate-limit', type=int, default=5000, help='fake GitHub calls per token (default: 5000)')
+    parser.add_argument('--artifact-size', type=int, default=8 * 1024 * 1024,
+                        help='artifact size in bytes (default: 8 MiB)')
+    parser.add_argument('--proxy-env', action='append', default=[], metavar='NAME=VALUE',
+                        help='extra environment for the proxy, repeatable')
+    parser.add_argument('--json', help='write the results to this file')
+    parser.add_argument('--baseline', help='earlier --json results to compare against')
+    args = parser.parse_args()
+
+    github_port, proxy_port = free_port(), free_port()
+    github = subprocess.Popen([
+        sys.executable, FAKE_GITHUB_SCRIPT, '--port', str(github_port),
+        '--latency', str(args.latency), '--jitter', str(args.jitter),
+        '--rate-limit', str(args.rate_limit), '--artifact-size', str(args.artifact_size),
+    ], stdout=subprocess.DEVNULL)
+
+    env = dict(os.environ,
+               PORT=str(proxy_port),
+               GITHUB_CLIENT_ID='benchmark',
+               GITHUB_CLIENT_SECRET='benchmark',
+               GITHUB_API_URL=f'http://127.0.0.1:{github_port}',
+               GITHUB_URL=f'http://127.0.0.1:{github_port}',
+               LOG_LEVEL='WARNING')
+    for setting in args.proxy_env:
+        name, _, value = setting.partition('=')
+        env[name] = value
+    proxy = subprocess.Popen([sys.executable, args.script], cwd=REPO_DIR, env=env,
+                             stdout=subprocess.DEVNULL)
+
+    try:
+        wait_for_port(github_port, github)
+        wait_for_port(proxy_port, proxy)
+        print(f"Benchmarking {os.path.basename(args.script)} for {args.duration:g}s "
+              f"with {args.concurrency} clients, mix {args.mix}, upstream latency {args.latency:g}ms")
+        report = run_workload(args, proxy_port, proxy.pid)
+    finally:
+        for process in (proxy, github):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+if __name__ == '__main__':
+    main()
@@ -192,7 +192,33 @@ export class AuthManager {
    */
   async verifyTokenPermissions() {
     try {
-      // Check if the token is valid by getting user info via proxy
+      // Ask the proxy, which answers from its token cache when it can
+      const checkResponse = await fetch(`${CONFIG.PROXY_BASE_URL}/auth/check?repo=${CONFIG.GITHUB.REPO_OWNER}/${CONFIG.GITHUB.REPO_NAME}`, {
+        headers: {
+          'Authorization': `token ${this.accessToken}`
+        }
+      });
+
+      if (checkResponse.status === 401) {
+        throw new Error(`Authentication failed: ${checkResponse.status}`);
+      }
+
+      if (checkResponse.ok) {
+        const check = await checkResponse.json();
+        appendAuthMessage(this.authStatus, `👤 Authenticated as: ${check.login}`, false);
+
+        if (!check.repo.accessible) {
+          if (check.repo.status === 403) {
+            throw new Error('Your token does not have the workflow permission. Please re-authenticate.');
+          }
+          throw new Error(`Failed to access workflows: ${check.repo.status}`);
+        }
+
+        appendAuthMessage(this.authStatus, '✅ Token verified with workflow access permissions.', false);
+        return;
+      }
+
+      // Older proxies have no /auth/check: ask GitHub for the user and workflows instead
       const userResponse = await fetch(`${CONFIG.PROXY_BASE_URL}/api/user`, {
         headers: {
           'Authorization': `token ${this.accessToken}`
@@ -68,9 +68,9 @@ export class WorkflowManager {
       if (result.success) {
         this.handleWorkflowStarted(result);
         
-        // Poll for workflow completion
+        // Watch for workflow completion
         if (result.runId) {
-          this.pollWorkflowStatus(result.runId);
+          this.watchWorkflowStatus(result.runId);
         }
       } else {
         this.handleWorkflowFailed(result.error);
@@ -97,8 +97,8 @@ export class WorkflowManager {
     try {
       appendLog(this.workflowLogs, 'Dispatching workflow run request via proxy');
       
-      // Make the API call via proxy to trigger the workflow
-      const response = await fetch(`${CONFIG.PROXY_BASE_URL}/api/repos/${CONFIG.GITHUB.REPO_OWNER}/${CONFIG.GITHUB.REPO_NAME}/actions/workflows/${CONFIG.GITHUB.WORKFLOW_ID}/dispatches`, {
+      // Dispatch via the proxy, which also finds and returns the new run
+      const response = await fetch(`${CONFIG.PROXY_BASE_URL}/dispatch/repos/${CONFIG.GITHUB.REPO_OWNER}/${CONFIG.GITHUB.REPO_NAME}/workflows/${CONFIG.GITHUB.WORKFLOW_ID}`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -109,14 +109,12 @@ export class WorkflowManager {
           inputs: {} // Any input parameters your workflow accepts
         })
       });
-        if (response.status === 204 || response.ok) {
+        if (response.ok) {
         appendLog(this.workflowLogs, 'Workflow dispatch received by GitHub');
-          // Wait a moment for GitHub to register the new workflow run
-        appendLog(this.workflowLogs, 'Waiting for new workflow run to be registered...');
-        await new Promise(resolve => setTimeout(resolve, 3000)); // Wait 3 seconds
+        const dispatchData = await response.json();
         
-        // Try to find the new workflow run with retries
-        const runId = await this.findNewWorkflowRunWithRetry();
+        // 202 means the proxy didn't see the run in time, so look for it here
+        const runId = dispatchData.run_id || await this.findNewWorkflowRunWithRetry();
         
         if (runId) {
           appendLog(this.workflowLogs, `New workflow run ID: ${runId}`);
@@ -192,6 +190,61 @@ export class WorkflowManager {
     }
   }
 
+  /**
+   * Wait for workflow completion using the proxy's shared run watcher,
+   * falling back to polling the GitHub API if the watcher is unavailable
+   */
+  async watchWorkflowStatus(runId) {
+    appendLog(this.workflowLogs, 'Watching workflow status...');
+    
+    const deadline = Date.now() + CONFIG.POLLING.MAX_POLLS * CONFIG.POLLING.POLL_INTERVAL;
+    let version = -1;
+    
+    try {
+      while (Date.now() < deadline) {
+        // Long-poll: the proxy answers as soon as the run state changes
+        const response = await fetch(`${CONFIG.PROXY_BASE_URL}/watch/repos/${CONFIG.GITHUB.REPO_OWNER}/${CONFIG.GITHUB.REPO_NAME}/runs/${runId}?mode=poll&since=${version}`, {
+          headers: {
+            'Authorization': `token ${this.authManager.getAccessToken()}`
+          }
+        });
+        
+        if (!response.ok) {
+          throw new Error(`Watch endpoint returned ${response.status}`);
+        }
+        
+        const data = await response.json();
+        if (data.error) {
+          throw new Error(data.error);
+        }
+        
+        if (data.version !== version && data.run) {
+          version = data.version;
+          const { status, conclusion } = data.run;
+          appendLog(this.workflowLogs, `Current status: ${status}${conclusion ? ', conclusion: ' + conclusion : ''}`);
+          
+          if (data.completed) {
+            if (conclusion === 'success') {
+              this.handleWorkflowSuccess(runId);
+            } else {
+              this.handleWorkflowFailure(conclusion);
+            }
+            return;
+          }
+        } else {
+          // The proxy answered without waiting (it is busy), so back off like regular polling
+          await new Promise(resolve => setTimeout(resolve, CONFIG.POLLING.POLL_INTERVAL));
+        }
+      }
+      
+      appendLog(this.workflowLogs, 'Exceeded maximum watch time. Please check GitHub directly for status.', true);
+      updateButtonState(this.workflowButton, 'normal', 'Get Azure Resource Groups');
+    } catch (error) {
+      appendLog(this.workflowLogs, `Run watcher unavailable (${error.message}), polling instead`);
+      this.pollWorkflowStatus(runId);
+    }
+  }
+
   /**
    * Poll for workflow completion via proxy
    */
@@ -352,7 +405,22 @@ export class WorkflowManager {
       
       appendLog(this.workflowLogs, `📂 Downloading artifact: ${artifact.name}`);
       
-      // Download the artifact
+      // Let the proxy extract the result file; it caches it, so repeat views are instant
+      const extractResponse = await fetch(`${CONFIG.PROXY_BASE_URL}/artifacts/repos/${CONFIG.GITHUB.REPO_OWNER}/${CONFIG.GITHUB.REPO_NAME}/${artifact.id}`, {
+        headers: {
+          'Authorization': `token ${this.authManager.getAccessToken()}`
+        }
+      });
+      
+      if (extractResponse.ok) {
+        const extracted = await extractResponse.json();
+        appendLog(this.workflowLogs, '📁 Artifact extracted by proxy');
+        this.displayExtractedFile(extracted.file, extracted.content);
+        return;
+      }
+      
+      // Fall back to downloading the zip and extracting it here
+      appendLog(this.workflowLogs, `Proxy extraction unavailable (${extractResponse.status}), downloading zip...`);
       const downloadResponse = await fetch(`${CONFIG.PROXY_BASE_URL}/api/repos/${CONFIG.GITHUB.REPO_OWNER}/${CONFIG.GITHUB.REPO_NAME}/actions/artifacts/${artifact.id}/zip`, {
         headers: {
           'Authorization': `token ${this.authManager.getAccessToken()}`
@@ -421,17 +489,7 @@ export class WorkflowManager {
       const jsonFile = zipContents.files[jsonFileName];
       const jsonContent = await jsonFile.async('text');
       
-      appendLog(this.workflowLogs, `📄 Processing file: ${jsonFileName}`);
-      
-      try {
-        const parsedData = JSON.parse(jsonContent);
-        this.displayResourceGroupData(parsedData);
-        appendLog(this.workflowLogs, '✅ Resource group data displayed successfully');
-      } catch (parseError) {
-        // If it's not valid JSON, display as text
-        this.displayArtifactContent(jsonFileName, jsonContent);
-        appendLog(this.workflowLogs, '✅ Artifact content displayed as text');
-      }
+      this.displayExtractedFile(jsonFileName, jsonContent);
       
     } catch (error) {
       console.error('Error extracting artifact:', error);
@@ -439,6 +497,28 @@ export class WorkflowManager {
     }
   }
 
+  /**
+   * Display a file extracted from an artifact, as resource group data if it is JSON
+   */
+  displayExtractedFile(filename, content) {
+    appendLog(this.workflowLogs, `📄 Processing file: ${filename}`);
+    
+    if (!filename.toLowerCase().endsWith('.json')) {
+      this.displayArtifactContent(filename, content);
+      return;
+    }
+    
+    try {
+      const parsedData = JSON.parse(content);
+      this.displayResourceGroupData(parsedData);
+      appendLog(this.workflowLogs, '✅ Resource group data displayed successfully');
+    } catch (parseError) {
+      // If it's not valid JSON, display as text
+      this.displayArtifactContent(filename, content);
+      appendLog(this.workflowLogs, '✅ Artifact content displayed as text');
+    }
+  }
+
   /**
    * Load JSZip library dynamically
    */
@@ -537,8 +617,8 @@ export class WorkflowManager {
    */
   async findNewWorkflowRun() {
     try {
-      // Get recent workflow runs
-      const runsResponse = await fetch(`${CONFIG.PROXY_BASE_URL}/api/repos/${CONFIG.GITHUB.REPO_OWNER}/${CONFIG.GITHUB.REPO_NAME}/actions/workflows/${CONFIG.GITHUB.WORKFLOW_ID}/runs?per_page=10`, {
+      // Get recent workflow runs, trimmed by the proxy to the fields used here
+      const runsResponse = await fetch(`${CONFIG.PROXY_BASE_URL}/status/repos/${CONFIG.GITHUB.REPO_OWNER}/${CONFIG.GITHUB.REPO_NAME}/workflows/${CONFIG.GITHUB.WORKFLOW_ID}?per_page=10`, {
         headers: {
           'Authorization': `token ${this.authManager.getAccessToken()}`
         }
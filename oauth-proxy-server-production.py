@@ -13,14 +13,113 @@ Environment Variables:
     GITHUB_CLIENT_SECRET: Your GitHub OAuth App Client Secret
     PORT: Port to run the server on (default: 8000)
     ALLOWED_ORIGINS: Comma-separated list of allowed origins for CORS
+    ALLOWED_ORIGIN_SUFFIXES: Comma-separated hostnames whose origins, and those
+        of their subdomains, are also allowed (default: localhost, 127.0.0.1,
+        github.io, azurewebsites.net, herokuapp.com, vercel.app, netlify.app)
+    CORS_MAX_AGE: Seconds browsers may cache a preflight response (default: 86400)
+    GITHUB_API_URL: Base URL of the GitHub REST API (default: https://api.github.com)
+    GITHUB_URL: Base URL of GitHub for the OAuth endpoints (default: https://github.com)
+    WORKER_PROCESSES: Pre-forked processes sharing the listening socket, or
+        auto for one per CPU (default: 1). Caches, rate-limit tracking,
+        watches and metrics are kept per process.
+    WORKER_THREADS: Number of threads serving requests concurrently in each
+        process (default: 32)
+    REQUEST_QUEUE_SIZE: Connections allowed to wait for a free worker before
+        new ones are rejected with 503 (default: 128)
+    CLIENT_SOCKET_TIMEOUT: Seconds a client connection may sit idle before it
+        is dropped (default: 30)
+    KEEPALIVE_TIMEOUT: Seconds an idle keep-alive client connection is kept
+        open waiting for its next request (default: 5)
+    KEEPALIVE_MAX_REQUESTS: Requests served on one client connection before
+        it is closed (default: 100)
+    SHUTDOWN_TIMEOUT: Seconds given to in-flight requests to finish after
+        SIGTERM (default: 20)
+    UPSTREAM_POOL_SIZE: Idle keep-alive connections kept per upstream host (default: 16)
+    UPSTREAM_IDLE_TIMEOUT: Seconds an idle upstream connection is kept (default: 60)
+    UPSTREAM_CONNECT_TIMEOUT: Upstream connect timeout in seconds (default: 5)
+    UPSTREAM_READ_TIMEOUT: Upstream read timeout in seconds (default: 30)
+    RESPONSE_CACHE_MAX_BYTES: Memory cap for cached API responses (default: 33554432)
+    RESPONSE_CACHE_MAX_ENTRIES: Maximum number of cached API responses (default: 2048)
+    RESPONSE_CACHE_TTL: Seconds a cached response is kept after it was last
+        validated against GitHub (default: 300)
+    STREAM_CHUNK_SIZE: Chunk size in bytes for streamed downloads (default: 65536)
+    ARTIFACT_CACHE_MAX_BYTES: Memory cap for files extracted by /artifacts (default: 67108864)
+    ARTIFACT_CACHE_MAX_ENTRIES: Maximum number of cached extracted files (default: 256)
+    ARTIFACT_MAX_DOWNLOAD_BYTES: Largest artifact /artifacts will download (default: 268435456)
+    COMPRESS_MIN_BYTES: Smallest body the proxy gzips for clients that accept
+        it; GitHub's own gzip is passed through regardless (default: 1024)
+    WATCH_MIN_INTERVAL / WATCH_MAX_INTERVAL: Bounds in seconds of the adaptive
+        upstream poll interval used by /watch (default: 2 / 15)
+    WATCH_MAX_STREAMS: Watch requests allowed to hold a worker thread at once;
+        beyond this /watch answers immediately (default: 16)
+    RATE_LIMIT_RESERVE: Per-token API quota held back for dispatches and other
+        non-GET calls once the remaining quota gets low (default: 100)
+    RATE_LIMIT_MAX_WAIT: Longest a request is held back waiting for quota, in
+        seconds; beyond that the proxy answers 429 itself (default: 10)
+    RATE_LIMIT_MAX_RETRIES: Retries of requests hit by a secondary rate limit (default: 3)
+    BATCH_MAX_REQUESTS: Sub-requests accepted in one /batch call (default: 20)
+    BATCH_WORKERS: Batch sub-requests sent to GitHub at once, across all
+        /batch calls (default: 16)
+    IDENTITY_CACHE_TTL: Seconds a token's user, scopes and repository access
+        are answered from memory (default: 120)
+    IDENTITY_CACHE_MAX_ENTRIES: Tokens whose identity is kept (default: 4096)
+    PAGINATE_MAX_PAGES: Most pages an /api GET with ?paginate merges into
+        one response (default: 20)
+    DISPATCH_CORRELATION_INPUT: Workflow input /dispatch fills with a correlation
+        id, matched against the run name (default: correlation_id)
+    DISPATCH_RESOLVE_TIMEOUT: Seconds /dispatch looks for the run it started
+        before answering without a run id (default: 20)
+    GITHUB_WEBHOOK_SECRET: Secret of the repository or organization webhook
+        posting to /webhooks/github; the endpoint is disabled without it
+    WEBHOOK_MAX_STALENESS: Longest, in seconds, a cached run or issue response
+        is answered without asking GitHub while webhooks report no change to
+        it (default: 30)
+    WEBHOOK_TRUST_TTL: Seconds after a repository's last delivery that its
+        webhooks are relied on to report changes (default: 900)
+    ORCHESTRATE_MAX_ACTIVE: Deployment plans /orchestrate runs at once (default: 8)
+    ORCHESTRATE_MAX_DURATION: Seconds a plan waits on its workflow runs before
+        failing the unfinished ones (default: 14400)
+    OAUTH_EXCHANGE_TIMEOUT: Overall deadline in seconds for exchanging an OAuth
+        code for a token, retries included (default: 15)
+    OAUTH_EXCHANGE_RETRIES: Retries of a token exchange that failed transiently (default: 2)
+    OAUTH_EXCHANGE_WORKERS: Token exchanges run at once (default: 4)
+    LOG_LEVEL: DEBUG, INFO, WARNING or ERROR (default: INFO)
+    LOG_FORMAT: json for one JSON object per line, or text (default: json)
+    LOG_SAMPLE_RATE: Fraction of high-volume log lines that are kept (default: 0.01)
 """
 
 import os
+import sys
 import json
+import copy
+import atexit
+import logging
+import logging.handlers
 import urllib.parse
 import urllib.request
+import http
+import http.client
 import http.server
+import ssl
+import select
+import signal
+import socket
+import time
 import socketserver
+import queue
+import threading
+import re
+import random
+import functools
+import graphlib
+import concurrent.futures
+import hashlib
+import hmac
+import gzip
+import zlib
+import tempfile
+import zipfile
+from collections import OrderedDict, deque
 from datetime import datetime
 import secrets
 import base64
@@ -30,32 +129,2483 @@ GITHUB_CLIENT_ID = os.environ.get('GITHUB_CLIENT_ID')
 GITHUB_CLIENT_SECRET = os.environ.get('GITHUB_CLIENT_SECRET')
 PORT = int(os.environ.get('PORT', 443))
 
+# Concurrency configuration
+WORKER_PROCESSES = os.environ.get('WORKER_PROCESSES', '1').strip().lower()
+WORKER_PROCESSES = (os.cpu_count() or 1) if WORKER_PROCESSES == 'auto' else max(1, int(WORKER_PROCESSES))
+WORKER_THREADS = max(1, int(os.environ.get('WORKER_THREADS', 32)))
+REQUEST_QUEUE_SIZE = max(1, int(os.environ.get('REQUEST_QUEUE_SIZE', 128)))
+CLIENT_SOCKET_TIMEOUT = float(os.environ.get('CLIENT_SOCKET_TIMEOUT', 30))
+KEEPALIVE_TIMEOUT = float(os.environ.get('KEEPALIVE_TIMEOUT', 5))
+KEEPALIVE_MAX_REQUESTS = int(os.environ.get('KEEPALIVE_MAX_REQUESTS', 100))
+SHUTDOWN_TIMEOUT = float(os.environ.get('SHUTDOWN_TIMEOUT', 20))
+WORKER_RESTART_DELAY = 1.0  # pause before replacing a worker that died right after starting
+WORKER_MIN_UPTIME = 5.0
+
+# GitHub endpoints
+GITHUB_API_URL = os.environ.get('GITHUB_API_URL', 'https://api.github.com').rstrip('/')
+GITHUB_URL = os.environ.get('GITHUB_URL', 'https://github.com').rstrip('/')
+
+# Upstream connection pool configuration
+UPSTREAM_POOL_SIZE = int(os.environ.get('UPSTREAM_POOL_SIZE', 16))
+UPSTREAM_IDLE_TIMEOUT = float(os.environ.get('UPSTREAM_IDLE_TIMEOUT', 60))
+UPSTREAM_CONNECT_TIMEOUT = float(os.environ.get('UPSTREAM_CONNECT_TIMEOUT', 5))
+UPSTREAM_READ_TIMEOUT = float(os.environ.get('UPSTREAM_READ_TIMEOUT', 30))
+
+# API response cache configuration
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get('RESPONSE_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 2048))
+RESPONSE_CACHE_TTL = float(os.environ.get('RESPONSE_CACHE_TTL', 300))
+
+# Artifact and log downloads are streamed to the client instead of buffered
+STREAM_CHUNK_SIZE = int(os.environ.get('STREAM_CHUNK_SIZE', 64 * 1024))
+STREAMED_PATH_SUFFIXES = ('/zip', '/logs')
+
+# Extracted artifact file cache configuration
+ARTIFACT_CACHE_MAX_BYTES = int(os.environ.get('ARTIFACT_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+ARTIFACT_CACHE_MAX_ENTRIES = int(os.environ.get('ARTIFACT_CACHE_MAX_ENTRIES', 256))
+ARTIFACT_MAX_DOWNLOAD_BYTES = int(os.environ.get('ARTIFACT_MAX_DOWNLOAD_BYTES', 256 * 1024 * 1024))
+ARTIFACT_MAX_FILE_BYTES = 8 * 1024 * 1024
+ARTIFACT_SPOOL_BYTES = 4 * 1024 * 1024  # downloads larger than this are spooled to disk
+ARTIFACT_MAX_GRANTS = 4096
+
+# Response compression configuration
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', 1024))
+COMPRESS_LEVEL = 6
+COMPRESSIBLE_TYPES = ('application/json', 'application/vnd.github', 'application/javascript', 'text/')
+
+# Workflow run watcher configuration
+WATCH_MIN_INTERVAL = float(os.environ.get('WATCH_MIN_INTERVAL', 2))
+WATCH_MAX_INTERVAL = float(os.environ.get('WATCH_MAX_INTERVAL', 15))
+WATCH_MAX_STREAMS = int(os.environ.get('WATCH_MAX_STREAMS', 16))
+WATCH_HEARTBEAT_INTERVAL = 15
+WATCH_LONG_POLL_TIMEOUT = 25
+WATCH_MAX_DURATION = 1800
+WATCH_IDLE_GRACE = 10
+
+# GitHub rate-limit scheduling configuration
+RATE_LIMIT_RESERVE = int(os.environ.get('RATE_LIMIT_RESERVE', 100))
+RATE_LIMIT_MAX_WAIT = float(os.environ.get('RATE_LIMIT_MAX_WAIT', 10))
+RATE_LIMIT_MAX_RETRIES = int(os.environ.get('RATE_LIMIT_MAX_RETRIES', 3))
+RATE_LIMIT_BACKOFF = 1.0
+RATE_LIMIT_LOW_WATERMARK = 0.2  # fraction of the quota below which GETs are paced
+
+# Batch endpoint configuration
+BATCH_MAX_REQUESTS = int(os.environ.get('BATCH_MAX_REQUESTS', 20))
+BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS', 16))
+BATCH_MAX_BODY = 1024 * 1024
+
+# Token identity cache (/auth/check, /api/user)
+IDENTITY_CACHE_TTL = float(os.environ.get('IDENTITY_CACHE_TTL', 120))
+IDENTITY_CACHE_MAX_ENTRIES = int(os.environ.get('IDENTITY_CACHE_MAX_ENTRIES', 4096))
+IDENTITY_REJECTED_TTL = 60  # seconds a token GitHub answered 401 for is refused locally
+IDENTITY_MAX_REPOS = 16  # repository access results kept per token
+
+# Server-side pagination (/api GETs with ?paginate)
+PAGINATE_MAX_PAGES = int(os.environ.get('PAGINATE_MAX_PAGES', 20))
+PAGINATE_CONCURRENCY = 4  # pages of one response fetched at once
+
+# Dispatch-and-resolve configuration
+DISPATCH_CORRELATION_INPUT = os.environ.get('DISPATCH_CORRELATION_INPUT', 'correlation_id')
+DISPATCH_RESOLVE_TIMEOUT = float(os.environ.get('DISPATCH_RESOLVE_TIMEOUT', 20))
+DISPATCH_RESOLVE_FIRST_DELAY = 1.0
+DISPATCH_RESOLVE_MAX_DELAY = 4.0
+DISPATCH_CLOCK_SKEW = 10  # seconds of slack when filtering runs by creation time
+DISPATCH_MAX_CLAIMS = 1024
+DISPATCH_MAX_BODY = 64 * 1024
+
+# GitHub webhook configuration
+GITHUB_WEBHOOK_SECRET = os.environ.get('GITHUB_WEBHOOK_SECRET')
+WEBHOOK_MAX_STALENESS = float(os.environ.get('WEBHOOK_MAX_STALENESS', 30))
+WEBHOOK_TRUST_TTL = float(os.environ.get('WEBHOOK_TRUST_TTL', 900))
+WEBHOOK_SETTLE_TIME = 2.0  # responses fetched this soon after an event may not reflect it yet
+WEBHOOK_MAX_BODY = 25 * 1024 * 1024  # GitHub caps payloads at 25 MB
+WEBHOOK_MAX_RUNS = 4096
+WEBHOOK_MAX_TOPICS = 16384
+
+# Multi-workflow orchestration configuration
+ORCHESTRATE_MAX_ACTIVE = int(os.environ.get('ORCHESTRATE_MAX_ACTIVE', 8))
+ORCHESTRATE_MAX_DURATION = float(os.environ.get('ORCHESTRATE_MAX_DURATION', 4 * 3600))
+ORCHESTRATE_MAX_STEPS = 16
+ORCHESTRATE_MAX_BODY = 64 * 1024
+ORCHESTRATE_RETENTION = 3600  # seconds a finished plan stays readable
+
+# OAuth token exchange configuration
+OAUTH_EXCHANGE_TIMEOUT = float(os.environ.get('OAUTH_EXCHANGE_TIMEOUT', 15))
+OAUTH_EXCHANGE_RETRIES = int(os.environ.get('OAUTH_EXCHANGE_RETRIES', 2))
+OAUTH_EXCHANGE_WORKERS = int(os.environ.get('OAUTH_EXCHANGE_WORKERS', 4))
+OAUTH_CONNECT_TIMEOUT = 3
+OAUTH_READ_TIMEOUT = 8
+
 # CORS configuration
 ALLOWED_ORIGINS = os.environ.get('ALLOWED_ORIGINS', '*').split(',')
 ALLOWED_ORIGINS = [origin.strip() for origin in ALLOWED_ORIGINS if origin.strip()]
+ALLOWED_ORIGIN_SUFFIXES = os.environ.get(
+    'ALLOWED_ORIGIN_SUFFIXES',
+    'localhost,127.0.0.1,github.io,azurewebsites.net,herokuapp.com,vercel.app,netlify.app').split(',')
+CORS_ALLOW_METHODS = 'GET, HEAD, POST, PUT, PATCH, DELETE, OPTIONS'
+CORS_ALLOW_HEADERS = ('Authorization, Content-Type, Accept, Origin, X-Requested-With, '
+                      'If-None-Match, If-Modified-Since, If-Match, If-Unmodified-Since, X-GitHub-Api-Version')
+# Response headers browser code may read besides the CORS-safelisted ones
+CORS_EXPOSE_HEADERS = ('ETag, Link, Location, Retry-After, X-Poll-Interval, X-GitHub-Request-Id, '
+                       'X-GitHub-Media-Type, X-OAuth-Scopes, X-Accepted-OAuth-Scopes, X-RateLimit-Limit, '
+                       'X-RateLimit-Remaining, X-RateLimit-Reset, X-RateLimit-Used, X-RateLimit-Resource')
+CORS_MAX_AGE = int(os.environ.get('CORS_MAX_AGE', 86400))
+CORS_HEADER_CACHE_SIZE = 1024
+
+# Logging configuration
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json').lower()
+LOG_SAMPLE_RATE = float(os.environ.get('LOG_SAMPLE_RATE', 0.01))
+LOG_QUEUE_SIZE = 10000
+
+# Pass as extra= to mark a high-volume line that is subject to LOG_SAMPLE_RATE
+SAMPLED = {'sampled': True}
+
+class JsonLogFormatter(logging.Formatter):
+    """Formats a record as a single JSON line, including any structured fields"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage()
+        }
+        if WORKER_PROCESSES > 1:
+            entry["pid"] = record.process
+        entry.update(getattr(record, 'fields', None) or {})
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class SamplingFilter(logging.Filter):
+    """Keeps only a fraction of the records logged with extra=SAMPLED"""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return not getattr(record, 'sampled', False) or random.random() < self.rate
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks the caller: records are dropped when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Only merge the message arguments here; JSON encoding happens on the listener thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+def setup_logging():
+    """Route the proxy's loggers through a queue to a single stdout writer thread"""
+    stream_handler = logging.StreamHandler(sys.stdout)
+    if LOG_FORMAT == 'text':
+        stream_handler.setFormatter(logging.Formatter('[%(asctime)s] %(levelname)s %(name)s: %(message)s',
+                                                      '%Y-%m-%d %H:%M:%S'))
+    else:
+        stream_handler.setFormatter(JsonLogFormatter())
+    
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    queue_handler = DroppingQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(LOG_SAMPLE_RATE))
+    listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    
+    # getLevelName maps a known level name to its number, anything else to a string
+    level = logging.getLevelName(LOG_LEVEL)
+    proxy_logger = logging.getLogger('oauth_proxy')
+    proxy_logger.handlers = [queue_handler]
+    proxy_logger.setLevel(level if isinstance(level, int) else logging.INFO)
+    proxy_logger.propagate = False
+    listener.start()
+    atexit.register(listener.stop)
+    if not isinstance(level, int):
+        proxy_logger.warning("Unknown LOG_LEVEL %r, logging at INFO", LOG_LEVEL)
+    return listener
+
+log_listener = setup_logging()
+logger = logging.getLogger('oauth_proxy')
+access_logger = logging.getLogger('oauth_proxy.access')
 
 # Validate required environment variables
 if not GITHUB_CLIENT_ID:
-    print("❌ ERROR: GITHUB_CLIENT_ID environment variable is required")
-    print("Set it with: export GITHUB_CLIENT_ID=your_client_id")
+    logger.error("GITHUB_CLIENT_ID environment variable is required "
+                 "(set it with: export GITHUB_CLIENT_ID=your_client_id)")
     exit(1)
 
 if not GITHUB_CLIENT_SECRET:
-    print("❌ ERROR: GITHUB_CLIENT_SECRET environment variable is required")
-    print("Set it with: export GITHUB_CLIENT_SECRET=your_client_secret")
+    logger.error("GITHUB_CLIENT_SECRET environment variable is required "
+                 "(set it with: export GITHUB_CLIENT_SECRET=your_client_secret)")
     exit(1)
 
-print(f"🚀 Starting OAuth Proxy Server on port {PORT}")
-print(f"📋 Client ID: {GITHUB_CLIENT_ID}")
-print(f"🔒 Client Secret: {'*' * len(GITHUB_CLIENT_SECRET)}")
-print(f"🌐 Allowed Origins: {ALLOWED_ORIGINS}")
+logger.info("Starting OAuth Proxy Server on port %s", PORT, extra={'fields': {
+    "client_id": GITHUB_CLIENT_ID,
+    "allowed_origins": ALLOWED_ORIGINS,
+    "allowed_origin_suffixes": ALLOWED_ORIGIN_SUFFIXES,
+    "worker_processes": WORKER_PROCESSES,
+    "worker_threads": WORKER_THREADS,
+    "request_queue_size": REQUEST_QUEUE_SIZE,
+    "github_api_url": GITHUB_API_URL,
+    "github_url": GITHUB_URL
+}})
+
+# Latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Distinct route labels kept per metric before new ones are folded into "other"
+METRICS_MAX_ROUTES = 200
+
+class MetricsRegistry:
+    """Thread-safe counters, gauges and histograms in the Prometheus text format
+
+    Labels are passed as a tuple of (name, value) pairs. Collectors are
+    callables run at scrape time that yield (kind, name, labels, value) for
+    state that already lives elsewhere, such as cache and pool statistics.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.kinds = {}
+        self.help = {}
+        self.values = {}
+        self.histograms = {}
+        self.collectors = []
+        self.routes = set()
+
+    def describe(self, name, kind, text):
+        self.kinds[name] = kind
+        self.help[name] = text
+
+    def inc(self, name, labels=(), value=1):
+        with self.lock:
+            series = self.values.setdefault(name, {})
+            series[labels] = series.get(labels, 0) + value
+
+    def set(self, name, labels, value):
+        with self.lock:
+            self.values.setdefault(name, {})[labels] = value
+
+    def observe(self, name, labels, value):
+        with self.lock:
+            series = self.histograms.setdefault(name, {})
+            counts = series.get(labels)
+            if counts is None:
+                counts = series[labels] = [0] * (len(LATENCY_BUCKETS) + 2)
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            counts[-2] += value
+            counts[-1] += 1
+
+    def route_label(self, route):
+        """Bound label cardinality: routes past METRICS_MAX_ROUTES become 'other'"""
+        with self.lock:
+            if route in self.routes:
+                return route
+            if len(self.routes) >= METRICS_MAX_ROUTES:
+                return 'other'
+            self.routes.add(route)
+            return route
+
+    @staticmethod
+    def format_labels(labels, extra=()):
+        pairs = tuple(labels) + tuple(extra)
+        if not pairs:
+            return ''
+        escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+        return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+    def render(self):
+        """Render every metric in the Prometheus text exposition format"""
+        collected = {}
+        for collector in self.collectors:
+            for kind, name, labels, value in collector():
+                self.kinds.setdefault(name, kind)
+                collected.setdefault(name, {})[labels] = value
+        
+        lines = []
+        with self.lock:
+            values = {name: dict(series) for name, series in self.values.items()}
+            histograms = {name: {labels: list(c) for labels, c in series.items()}
+                          for name, series in self.histograms.items()}
+        for name, series in collected.items():
+            values.setdefault(name, {}).update(series)
+        
+        for name in sorted(set(values) | set(histograms)):
+            if name in self.help:
+                lines.append(f'# HELP {name} {self.help[name]}')
+            lines.append(f'# TYPE {name} {self.kinds.get(name, "untyped")}')
+            for labels, value in sorted(values.get(name, {}).items()):
+                lines.append(f'{name}{self.format_labels(labels)} {value}')
+            for labels, counts in sorted(histograms.get(name, {}).items()):
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{self.format_labels(labels, (("le", bound),))} {cumulative}')
+                lines.append(f'{name}_bucket{self.format_labels(labels, (("le", "+Inf"),))} {counts[-1]}')
+                lines.append(f'{name}_sum{self.format_labels(labels)} {counts[-2]:.6f}')
+                lines.append(f'{name}_count{self.format_labels(labels)} {counts[-1]}')
+        return '\n'.join(lines) + '\n'
+
+metrics = MetricsRegistry()
+metrics.describe('proxy_requests_total', 'counter', 'Requests handled, by route, method and status')
+metrics.describe('proxy_request_duration_seconds', 'histogram', 'Total handler time, by route and method')
+metrics.describe('proxy_requests_in_flight', 'gauge', 'Requests currently being handled')
+metrics.describe('proxy_preflight_requests_total', 'counter', 'CORS preflights answered from the precomputed responses')
+metrics.describe('proxy_requests_rejected_total', 'counter', 'Connections rejected with 503 because the queue was full')
+metrics.describe('proxy_upstream_requests_total', 'counter', 'Upstream calls, by host, route, method and status')
+metrics.describe('proxy_upstream_duration_seconds', 'histogram',
+                 'Upstream time until response headers (redirects included), by host, route and method')
+metrics.describe('proxy_webhook_deliveries_total', 'counter', 'GitHub webhook deliveries, by event and outcome')
+
+def github_path_template(path):
+    """Normalize a GitHub API path into a low-cardinality template
+
+    /repos/octo/app/actions/runs/42/artifacts -> /repos/{owner}/{repo}/actions/runs/{id}/artifacts
+    """
+    segments = path.split('?', 1)[0].strip('/').split('/')
+    if segments[0] == 'repos' and len(segments) >= 3:
+        segments[1:3] = ['{owner}', '{repo}']
+    for index, segment in enumerate(segments):
+        if segment.isdigit():
+            segments[index] = '{id}'
+        elif index and segments[index - 1] == 'workflows' and segment != '{id}':
+            segments[index] = '{workflow}'
+    return '/' + '/'.join(segments)
+
+def route_template(path):
+    """Metric route label for a request path handled by this server"""
+    path = path.split('?', 1)[0]
+    if path.startswith('/api/'):
+        return metrics.route_label('/api' + github_path_template(path[4:]))
+    if path.startswith('/watch/'):
+        return '/watch/repos/{owner}/{repo}/runs/{id}'
+    if path.startswith('/dispatch/'):
+        return '/dispatch/repos/{owner}/{repo}/workflows/{workflow}'
+    if path.startswith('/status/'):
+        return '/status/repos/{owner}/{repo}/workflows/{workflow}'
+    if path.startswith('/artifacts/'):
+        return '/artifacts/repos/{owner}/{repo}/{id}'
+    if path.startswith('/orchestrate/repos/'):
+        return '/orchestrate/repos/{owner}/{repo}'
+    if path.startswith('/orchestrate/'):
+        return '/orchestrate/{id}'
+    if path in ('/', '/health', '/metrics', '/batch', '/auth/check', '/webhooks/github',
+                '/oauth/authorize', '/oauth/callback'):
+        return path
+    return 'other'
+
+def instrumented(handler_method):
+    """Record count, status and latency of a do_* handler method"""
+    @functools.wraps(handler_method)
+    def wrapper(self):
+        self.response_status = None
+        metrics.inc('proxy_requests_in_flight')
+        start = time.perf_counter()
+        try:
+            return handler_method(self)
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.inc('proxy_requests_in_flight', value=-1)
+            route = route_template(self.path)
+            metrics.inc('proxy_requests_total', (('route', route), ('method', self.command),
+                                                 ('status', str(self.response_status or 0))))
+            metrics.observe('proxy_request_duration_seconds', (('route', route), ('method', self.command)), elapsed)
+    return wrapper
+
+class PooledResponse:
+    """Upstream response that hands its connection back to the pool when closed"""
+
+    def __init__(self, pool, key, connection, response):
+        self.pool = pool
+        self.key = key
+        self.connection = connection
+        self.response = response
+        self.status = response.status
+        self.reason = response.reason
+        self.headers = response.headers
+
+    def read(self, amt=None):
+        return self.response.read(amt)
+
+    def getheader(self, name, default=None):
+        return self.response.getheader(name, default)
+
+    def getheaders(self):
+        return self.response.getheaders()
+
+    def close(self):
+        """Release the connection, keeping it only if the body was fully read"""
+        if self.connection is None:
+            return
+        reusable = (self.response.isclosed() and not self.response.will_close
+                    and self.connection.sock is not None)
+        if not reusable:
+            self.response.close()
+        self.pool.release(self.key, self.connection, reusable)
+        self.connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+# Methods safe to resend when a reused connection dies before the response
+IDEMPOTENT_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'))
+
+class UpstreamConnectionPool:
+    """Thread-safe pool of persistent HTTP/1.1 connections, keyed by host
+
+    Idle connections are kept per (scheme, host, port) up to ``max_size`` and
+    are evicted once they have been idle for ``idle_timeout`` seconds. A request
+    that fails on a reused connection (the server closed it while it sat in the
+    pool) is retried once on a fresh connection: while sending it for any
+    method, but after it went out only for idempotent ones, since GitHub may
+    already have acted on a POST or PATCH it never answered.
+    """
+
+    def __init__(self, max_size=UPSTREAM_POOL_SIZE, idle_timeout=UPSTREAM_IDLE_TIMEOUT,
+                 connect_timeout=UPSTREAM_CONNECT_TIMEOUT, read_timeout=UPSTREAM_READ_TIMEOUT):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.ssl_context = ssl.create_default_context()
+        self.lock = threading.Lock()
+        self.idle = {}
+        self.last_sweep = time.monotonic()
+        self.stats = {"created": 0, "reused": 0, "discarded": 0}
+
+    def request(self, method, url, body=None, headers=None, timeouts=None):
+        """Send a request and return a PooledResponse (use it as a context manager)
+
+        timeouts is an optional (connect, read) pair overriding the pool defaults.
+        """
+        connect_timeout, read_timeout = timeouts or (self.connect_timeout, self.read_timeout)
+        parts = urllib.parse.urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == 'https' else 80))
+        target = parts.path or '/'
+        if parts.query:
+            target += '?' + parts.query
+
+        for attempt in range(2):
+            connection, reused = self.acquire(key, connect_timeout)
+            sent = False
+            try:
+                connection.sock.settimeout(read_timeout)
+                connection.request(method, target, body=body, headers=headers or {})
+                sent = True
+                response = connection.getresponse()
+            except (ConnectionResetError, BrokenPipeError, http.client.BadStatusLine):
+                self.discard(connection)
+                if reused and attempt == 0 and (not sent or method in IDEMPOTENT_METHODS):
+                    continue
+                raise
+            except Exception:
+                self.discard(connection)
+                raise
+            return PooledResponse(self, key, connection, response)
+
+    def acquire(self, key, connect_timeout):
+        """Return (connection, reused) for the given host key"""
+        now = time.monotonic()
+        stale = []
+        connection = None
+        with self.lock:
+            if now - self.last_sweep > self.idle_timeout / 2:
+                stale.extend(self.sweep(now))
+            idle = self.idle.get(key, [])
+            while idle:
+                candidate, last_used = idle.pop()
+                if now - last_used < self.idle_timeout and self.is_alive(candidate):
+                    connection = candidate
+                    self.stats["reused"] += 1
+                    break
+                stale.append(candidate)
+        for candidate in stale:
+            self.discard(candidate)
+        if connection is not None:
+            return connection, True
+        return self.connect(key, connect_timeout), False
+
+    def connect(self, key, connect_timeout):
+        """Open a new connection; the read timeout is applied per request"""
+        scheme, host, port = key
+        if scheme == 'https':
+            connection = http.client.HTTPSConnection(host, port, timeout=connect_timeout,
+                                                     context=self.ssl_context)
+        else:
+            connection = http.client.HTTPConnection(host, port, timeout=connect_timeout)
+        connection.connect()
+        with self.lock:
+            self.stats["created"] += 1
+        return connection
+
+    def release(self, key, connection, reusable):
+        """Return a connection to the idle pool, or close it"""
+        if reusable:
+            with self.lock:
+                idle = self.idle.setdefault(key, [])
+                if len(idle) < self.max_size:
+                    idle.append((connection, time.monotonic()))
+                    return
+        self.discard(connection)
+
+    def discard(self, connection):
+        with self.lock:
+            self.stats["discarded"] += 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def sweep(self, now):
+        """Drop idle connections past the idle timeout (caller holds the lock)"""
+        self.last_sweep = now
+        expired = []
+        for key, idle in self.idle.items():
+            keep = [(c, t) for c, t in idle if now - t < self.idle_timeout]
+            expired.extend(c for c, t in idle if now - t >= self.idle_timeout)
+            self.idle[key] = keep
+        return expired
+
+    @staticmethod
+    def is_alive(connection):
+        """An idle keep-alive socket that is readable has been closed by the server"""
+        if connection.sock is None:
+            return False
+        try:
+            readable, _, _ = select.select([connection.sock], [], [], 0)
+        except (OSError, ValueError):
+            return False
+        return not readable
+
+upstream_pool = UpstreamConnectionPool()
+
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+def open_upstream(method, url, headers=None, body=None, max_redirects=5, timeouts=None):
+    """Send a request through the connection pool, following redirects
+
+    Redirects to another host (artifact downloads are redirected to blob
+    storage) are followed without the Authorization header.
+    """
+    parts = urllib.parse.urlsplit(url)
+    labels = (('host', parts.hostname), ('route', metrics.route_label(github_path_template(parts.path))),
+              ('method', method))
+    start = time.perf_counter()
+    status = 'error'
+    try:
+        response = follow_redirects(method, url, headers, body, max_redirects, timeouts)
+        status = response.status
+        return response
+    finally:
+        metrics.inc('proxy_upstream_requests_total', labels + (('status', str(status)),))
+        metrics.observe('proxy_upstream_duration_seconds', labels, time.perf_counter() - start)
+
+def follow_redirects(method, url, headers, body, max_redirects, timeouts):
+    """Send a request, following up to max_redirects redirects"""
+    headers = dict(headers or {})
+    for _ in range(max_redirects + 1):
+        response = upstream_pool.request(method, url, body=body, headers=headers, timeouts=timeouts)
+        location = response.getheader('Location')
+        if response.status not in REDIRECT_CODES or not location:
+            return response
+        response.read()
+        response.close()
+        next_url = urllib.parse.urljoin(url, location)
+        if urllib.parse.urlsplit(next_url).netloc != urllib.parse.urlsplit(url).netloc:
+            headers.pop('Authorization', None)
+        if response.status == 303 or (response.status in (301, 302) and method == 'POST'):
+            method, body = 'GET', None
+            headers.pop('Content-Type', None)
+        url = next_url
+    raise http.client.HTTPException(f"Too many redirects for {url}")
+
+class UpstreamResult:
+    """A fully buffered GitHub API response
+
+    ``body`` is kept as received, so it may be gzip-encoded (see
+    ``content_encoding``); ``content`` is always the decoded body.
+    ``headers`` holds the CACHED_HEADERS the proxy interprets itself and
+    ``forwarded`` the other end-to-end headers, passed to the client as is.
+    """
+
+    def __init__(self, status, headers, body, forwarded=()):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.forwarded = forwarded
+        self.stored_at = time.monotonic()
+        self.gzipped_body = None
+
+    @property
+    def content_encoding(self):
+        return self.headers.get('Content-Encoding')
+
+    @property
+    def content(self):
+        """The body with its Content-Encoding removed"""
+        if self.content_encoding == 'gzip':
+            return gzip.decompress(self.body)
+        return self.body
+
+    def encoded(self, accept_gzip):
+        """(body, Content-Encoding) to send to a client, gzipping compressible bodies it accepts
+
+        A gzip body from GitHub is passed through as is; a body the proxy
+        compresses itself is compressed once and kept with the result.
+        """
+        if self.content_encoding == 'gzip':
+            return (self.body, 'gzip') if accept_gzip else (self.content, None)
+        if accept_gzip and is_compressible(self.headers.get('Content-Type'), len(self.body)):
+            if self.gzipped_body is None:
+                self.gzipped_body = gzip.compress(self.body, COMPRESS_LEVEL)
+            return self.gzipped_body, 'gzip'
+        return self.body, None
+
+    @property
+    def etag(self):
+        return self.headers.get('ETag')
+
+    @property
+    def last_modified(self):
+        return self.headers.get('Last-Modified')
+
+    @property
+    def size(self):
+        return len(self.body) + sum(len(k) + len(v) for k, v in (*self.headers.items(), *self.forwarded))
+
+def is_compressible(content_type, size):
+    """Whether a body of this type and size is worth gzipping"""
+    return (size is None or size >= COMPRESS_MIN_BYTES) and (content_type or '').startswith(COMPRESSIBLE_TYPES)
+
+def accepts_gzip(accept_encoding):
+    """Whether an Accept-Encoding header value allows gzip"""
+    for coding in (accept_encoding or '').lower().split(','):
+        name, _, params = coding.partition(';')
+        if name.strip() in ('gzip', '*'):
+            q = params.strip()
+            if not q.startswith('q='):
+                return True
+            try:
+                return float(q[2:]) > 0
+            except ValueError:
+                # An unreadable q-value doesn't say gzip is acceptable
+                return False
+    return False
+
+class ResponseCache:
+    """LRU cache of validator-bearing GitHub responses with a TTL and memory cap
+
+    Entries are keyed by (token fingerprint, method, path, Accept and API
+    version) so one user's responses are never served to another, nor one
+    media type for another. Entries are not served blindly:
+    they supply the ETag/Last-Modified validators for a conditional request,
+    and GitHub answers those with a 304 that does not count against the rate
+    limit. The exception is responses webhooks vouch for (see WebhookState).
+    """
+
+    def __init__(self, max_bytes=RESPONSE_CACHE_MAX_BYTES, max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+                 ttl=RESPONSE_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_entry_bytes = max_bytes // 8
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "revalidated": 0, "evictions": 0}
+
+    def get(self, key):
+        """Return the cached UpstreamResult for key, or None"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            if time.monotonic() - entry.stored_at > self.ttl:
+                self.remove(key)
+                self.stats["misses"] += 1
+                return None
+            self.entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry
+
+    def put(self, key, result):
+        """Store a response if it carries a validator and fits the size limits"""
+        if not (result.etag or result.last_modified) or result.size > self.max_entry_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self.remove(key)
+            self.entries[key] = result
+            self.bytes += result.size
+            while self.entries and (len(self.entries) > self.max_entries or self.bytes > self.max_bytes):
+                oldest = next(iter(self.entries))
+                self.remove(oldest)
+                self.stats["evictions"] += 1
+
+    def revalidated(self, key, result, not_modified=None):
+        """Mark an entry as fresh again after GitHub answered 304, taking the 304's headers"""
+        with self.lock:
+            result.stored_at = time.monotonic()
+            stored = self.entries.get(key) is result
+            if stored:
+                self.entries.move_to_end(key)
+                self.bytes -= result.size
+            if not_modified is not None:
+                result.forwarded = merge_headers(result.forwarded, not_modified.forwarded)
+            if stored:
+                self.bytes += result.size
+            self.stats["revalidated"] += 1
+
+    def remove(self, key):
+        """Drop an entry (caller holds the lock)"""
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry.size
+
+response_cache = ResponseCache()
+
+class InFlightRequest:
+    """An upstream call that other identical requests can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class RequestCoalescer:
+    """Single-flight deduplication of identical concurrent upstream requests
+
+    The first caller for a key (the leader) performs the call; callers that
+    arrive while it is in flight wait for it and share its result or error.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.flights = {}
+        self.stats = {"leaders": 0, "followers": 0}
+
+    def run(self, key, fetch):
+        """Return fetch()'s result, sharing it with concurrent callers for the same key"""
+        with self.lock:
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[key] = InFlightRequest()
+                self.stats["leaders"] += 1
+            else:
+                self.stats["followers"] += 1
+        
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        
+        try:
+            flight.result = fetch()
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.flights[key]
+            flight.done.set()
+
+request_coalescer = RequestCoalescer()
+
+# Response headers kept on buffered API responses
+CACHED_HEADERS = ('Content-Type', 'Content-Encoding', 'ETag', 'Last-Modified')
+
+# Headers that describe a single connection rather than the message (RFC 9110 7.6.1);
+# they are never forwarded in either direction, nor are the ones named in Connection
+HOP_BY_HOP_HEADERS = frozenset(('connection', 'keep-alive', 'proxy-connection', 'proxy-authenticate',
+                                'proxy-authorization', 'te', 'trailer', 'transfer-encoding', 'upgrade'))
+
+# Client request headers passed on to GitHub by /api; the rest either
+# belong to the browser-proxy hop or are set by the proxy itself
+FORWARDED_REQUEST_HEADERS = ('Accept', 'Content-Type', 'If-Match', 'If-Unmodified-Since',
+                             'X-GitHub-Api-Version', 'Time-Zone')
+
+# Request headers that select a representation, so they are part of the cache key
+VARIANT_REQUEST_HEADERS = ('Accept', 'X-GitHub-Api-Version')
+
+# GitHub response headers the proxy sets itself, or that would misdescribe its response
+PROXY_RESPONSE_HEADERS = frozenset(name.lower() for name in CACHED_HEADERS) | frozenset((
+    'content-length', 'cache-control', 'vary', 'date', 'server', 'set-cookie'))
+
+# Methods /api forwards, as (sends the request body on, GETs go through the response cache)
+API_PROXY_METHODS = {
+    'GET': (False, True),
+    'HEAD': (False, False),
+    'POST': (True, False),
+    'PUT': (True, False),
+    'PATCH': (True, False),
+    'DELETE': (True, False),
+}
+
+# Response headers forwarded on streamed downloads
+STREAMED_HEADERS = ('Content-Disposition', 'ETag', 'Last-Modified')
+
+def connection_headers(message):
+    """Lower-cased names of the hop-by-hop headers of a message, including those listed in Connection"""
+    names = set(HOP_BY_HOP_HEADERS)
+    for value in message.get_all('Connection') or ():
+        names.update(token.strip().lower() for token in value.split(','))
+    return names
+
+def forwarded_request_headers(message):
+    """End-to-end client request headers to pass on to GitHub"""
+    hop_by_hop = connection_headers(message)
+    return {name: message[name] for name in FORWARDED_REQUEST_HEADERS
+            if message[name] is not None and name.lower() not in hop_by_hop}
+
+def forwarded_response_headers(response):
+    """End-to-end GitHub response headers to pass on to the client, in order"""
+    hop_by_hop = connection_headers(response.headers)
+    return tuple((name, value) for name, value in response.getheaders()
+                 if name.lower() not in hop_by_hop and name.lower() not in PROXY_RESPONSE_HEADERS
+                 and not name.lower().startswith('access-control-'))
+
+def merge_headers(stored, fresh):
+    """Update stored headers with those of a 304, as a cache does (RFC 9111 4.3.4)"""
+    replaced = {name.lower() for name, _ in fresh}
+    return tuple(header for header in stored if header[0].lower() not in replaced) + tuple(fresh)
+
+def token_fingerprint(auth_header):
+    """Stable, non-reversible key for an Authorization header value"""
+    return hashlib.sha256(auth_header.encode()).hexdigest()[:32]
+
+def github_headers(auth_header):
+    """Headers sent with every proxied GitHub API request"""
+    return {
+        'Authorization': auth_header,
+        'Accept': 'application/vnd.github.v3+json',
+        'User-Agent': 'GitHub-OAuth-Proxy/1.0'
+    }
+
+class RateLimited(Exception):
+    """Raised when a request would have to wait too long for rate-limit quota"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"GitHub rate limit nearly exhausted, retry in {int(retry_after) + 1}s")
+        self.retry_after = retry_after
+
+class TokenQuota:
+    """Last known rate-limit state of one token"""
+
+    def __init__(self):
+        self.limit = None
+        self.remaining = None
+        self.reset_at = 0.0
+        self.blocked_until = 0.0
+
+class RateLimitScheduler:
+    """Per-token pacing of GitHub API calls based on its rate-limit headers
+
+    Tracks X-RateLimit-Limit/Remaining/Reset and Retry-After for each token.
+    Once the remaining quota drops below RATE_LIMIT_LOW_WATERMARK of the
+    limit, GETs and HEADs are spread out over the time left until the reset,
+    and the last RATE_LIMIT_RESERVE calls are kept for urgent (write)
+    requests such as workflow dispatches. A Retry-After or an exhausted
+    quota blocks every request for that token until it expires. Requests
+    that would wait longer than RATE_LIMIT_MAX_WAIT fail fast with
+    RateLimited instead.
+    """
+
+    def __init__(self, reserve=RATE_LIMIT_RESERVE, max_wait=RATE_LIMIT_MAX_WAIT):
+        self.reserve = reserve
+        self.max_wait = max_wait
+        self.lock = threading.Lock()
+        self.quotas = {}
+        self.stats = {"delayed": 0, "rejected": 0, "retried": 0}
+
+    def delay_for(self, quota, urgent, now):
+        """Seconds a request should wait before being sent (caller holds the lock)"""
+        if quota.blocked_until > now:
+            return quota.blocked_until - now
+        if quota.remaining is None or quota.reset_at <= now:
+            return 0
+        until_reset = quota.reset_at - now
+        if quota.remaining <= 0:
+            return until_reset
+        if urgent:
+            return 0
+        if quota.remaining <= self.reserve:
+            return until_reset
+        if quota.limit and quota.remaining < quota.limit * RATE_LIMIT_LOW_WATERMARK:
+            return until_reset / (quota.remaining - self.reserve)
+        return 0
+
+    def acquire(self, fingerprint, urgent=False):
+        """Wait until the token may send a request, or raise RateLimited"""
+        if fingerprint is None:
+            return
+        with self.lock:
+            quota = self.quotas.get(fingerprint)
+            if quota is None:
+                return
+            delay = self.delay_for(quota, urgent, time.time())
+            if delay > self.max_wait:
+                self.stats["rejected"] += 1
+                raise RateLimited(delay)
+            if quota.remaining is not None:
+                # Count the call now so concurrent requests see the lower quota
+                quota.remaining -= 1
+            if delay > 0:
+                self.stats["delayed"] += 1
+        if delay > 0:
+            time.sleep(delay)
+
+    def update(self, fingerprint, status, headers):
+        """Record the rate-limit headers of a GitHub response"""
+        if fingerprint is None:
+            return
+        now = time.time()
+        with self.lock:
+            quota = self.quotas.setdefault(fingerprint, TokenQuota())
+            try:
+                if headers.get('X-RateLimit-Limit'):
+                    quota.limit = int(headers['X-RateLimit-Limit'])
+                if headers.get('X-RateLimit-Remaining'):
+                    quota.remaining = int(headers['X-RateLimit-Remaining'])
+                if headers.get('X-RateLimit-Reset'):
+                    quota.reset_at = float(headers['X-RateLimit-Reset'])
+                retry_after = retry_after_seconds(headers)
+            except ValueError:
+                return
+            if retry_after is not None:
+                quota.blocked_until = now + retry_after
+            elif status in (403, 429) and quota.remaining == 0:
+                quota.blocked_until = quota.reset_at
+
+rate_limiter = RateLimitScheduler()
+
+def retry_after_seconds(headers):
+    """Parse a Retry-After header given in seconds"""
+    value = headers.get('Retry-After')
+    return float(value) if value else None
+
+def secondary_limit_delay(status, headers, body, attempt):
+    """Jittered backoff before retrying a secondary rate limit response, or None
+
+    Primary limit exhaustion is not retried: the quota only returns at the
+    reset time, which is far longer than any request should be held.
+    """
+    if status not in (403, 429) or attempt >= RATE_LIMIT_MAX_RETRIES:
+        return None
+    retry_after = retry_after_seconds(headers)
+    if retry_after is None and b'secondary rate limit' not in body.lower():
+        return None
+    backoff = RATE_LIMIT_BACKOFF * 2 ** attempt
+    delay = max(retry_after or 0, random.uniform(backoff / 2, backoff * 1.5))
+    return delay if delay <= RATE_LIMIT_MAX_WAIT else None
+
+def open_github(method, github_url, headers, body=None):
+    """open_upstream() for GitHub API calls, paced by the rate-limit scheduler"""
+    fingerprint = None
+    if github_url.startswith(GITHUB_API_URL) and headers.get('Authorization'):
+        fingerprint = token_fingerprint(headers['Authorization'])
+    rate_limiter.acquire(fingerprint, urgent=method not in ('GET', 'HEAD'))
+    response = open_upstream(method, github_url, headers=headers, body=body)
+    rate_limiter.update(fingerprint, response.status, response.headers)
+    if fingerprint and response.status == 401 and github_url.startswith(GITHUB_API_URL):
+        identity_cache.reject(fingerprint)
+    return response
+
+def fetch_upstream(method, github_url, headers, body=None):
+    """Send a request to GitHub and buffer the response, retrying secondary rate limits
+
+    GitHub is asked for gzip; the compressed body is kept as is.
+    """
+    headers = dict(headers, **{'Accept-Encoding': 'gzip'})
+    attempt = 0
+    while True:
+        with open_github(method, github_url, headers, body) as response:
+            kept = {name: response.getheader(name) for name in CACHED_HEADERS if response.getheader(name)}
+            result = UpstreamResult(response.status, kept, response.read(), forwarded_response_headers(response))
+            delay = secondary_limit_delay(response.status, response.headers, result.content, attempt)
+        if delay is None:
+            return result
+        logger.warning("Secondary rate limit on %s, retrying in %.1fs", github_url, delay)
+        with rate_limiter.lock:
+            rate_limiter.stats["retried"] += 1
+        time.sleep(delay)
+        attempt += 1
+
+def fetch_cached(api_path, headers):
+    """GET through the response cache, sharing the call with identical in-flight GETs"""
+    cache_key = (token_fingerprint(headers['Authorization']), 'GET', api_path,
+                 tuple(headers.get(name) for name in VARIANT_REQUEST_HEADERS))
+    return request_coalescer.run(cache_key, lambda: revalidate(cache_key, api_path, headers))
+
+def revalidate(cache_key, api_path, headers):
+    """GET from GitHub, revalidating the cached entry if there is one"""
+    cached = response_cache.get(cache_key)
+    if cached is not None and webhook_state.is_fresh(api_path, cached):
+        return cached
+    if cached is not None:
+        headers = dict(headers)
+        if cached.etag:
+            headers['If-None-Match'] = cached.etag
+        if cached.last_modified:
+            headers['If-Modified-Since'] = cached.last_modified
+    
+    result = fetch_upstream('GET', f'{GITHUB_API_URL}{api_path}', headers)
+    
+    if result.status == 304 and cached is not None:
+        logger.debug("Not modified upstream, serving cached response for: %s", api_path)
+        response_cache.revalidated(cache_key, cached, result)
+        return cached
+    if result.status == 200:
+        response_cache.put(cache_key, result)
+    return result
+
+# Accept values the cached default /user response (v3 JSON) satisfies
+IDENTITY_MEDIA_TYPES = frozenset(('*/*', 'application/*', 'application/json',
+                                  'application/vnd.github+json', 'application/vnd.github.v3+json'))
+
+def accepts_identity_json(accept):
+    """Whether an Accept header is answered by GitHub's default JSON media type"""
+    media_types = [part.split(';', 1)[0].strip().lower() for part in (accept or '*/*').split(',')]
+    return (any(media_type in IDENTITY_MEDIA_TYPES for media_type in media_types)
+            and not any(media_type.startswith('application/vnd.github') and media_type not in IDENTITY_MEDIA_TYPES
+                        for media_type in media_types))
+
+class TokenIdentity:
+    """What GitHub said about a token: its user, OAuth scopes and repository access"""
+
+    def __init__(self, user_result):
+        self.user_result = user_result
+        user = json.loads(user_result.content)
+        self.login = user.get('login')
+        self.user_id = user.get('id')
+        # Fine-grained tokens and GitHub App tokens have no X-OAuth-Scopes
+        scopes = next((value for name, value in user_result.forwarded if name.lower() == 'x-oauth-scopes'), None)
+        self.scopes = None if scopes is None else [scope.strip() for scope in scopes.split(',') if scope.strip()]
+        self.repos = OrderedDict()  # 'owner/repo' -> access summary
+        self.stored_at = time.monotonic()
+
+    def describe(self):
+        return {"login": self.login, "id": self.user_id, "scopes": self.scopes}
+
+class IdentityCache:
+    """Short-lived LRU of token identities, keyed by token fingerprint
+
+    Identity and permission checks are answered from here for
+    IDENTITY_CACHE_TTL seconds. Tokens GitHub answered 401 for are kept as
+    rejected for IDENTITY_REJECTED_TTL, and refused without an upstream call.
+    """
+
+    def __init__(self, max_entries=IDENTITY_CACHE_MAX_ENTRIES, ttl=IDENTITY_CACHE_TTL,
+                 rejected_ttl=IDENTITY_REJECTED_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.rejected_ttl = rejected_ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # fingerprint -> (stored at, TokenIdentity, or None if rejected)
+        self.stats = {"hits": 0, "misses": 0, "rejected": 0}
+
+    def lookup(self, fingerprint):
+        """(found, identity) for a token; a found None identity means GitHub rejected it"""
+        with self.lock:
+            entry = self.entries.get(fingerprint)
+            if entry is not None:
+                stored_at, identity = entry
+                ttl = self.ttl if identity is not None else self.rejected_ttl
+                if time.monotonic() - stored_at <= ttl:
+                    self.entries.move_to_end(fingerprint)
+                    self.stats["hits" if identity is not None else "rejected"] += 1
+                    return True, identity
+                del self.entries[fingerprint]
+            self.stats["misses"] += 1
+            return False, None
+
+    def is_rejected(self, fingerprint):
+        with self.lock:
+            entry = self.entries.get(fingerprint)
+            if entry is None or entry[1] is not None or time.monotonic() - entry[0] > self.rejected_ttl:
+                return False
+            self.stats["rejected"] += 1
+            return True
+
+    def put(self, fingerprint, identity):
+        with self.lock:
+            self.entries[fingerprint] = (identity.stored_at if identity else time.monotonic(), identity)
+            self.entries.move_to_end(fingerprint)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def reject(self, fingerprint):
+        self.put(fingerprint, None)
+
+    def repo_access(self, identity, repo_key):
+        with self.lock:
+            return identity.repos.get(repo_key)
+
+    def record_repo_access(self, identity, repo_key, access):
+        with self.lock:
+            identity.repos[repo_key] = access
+            while len(identity.repos) > IDENTITY_MAX_REPOS:
+                identity.repos.popitem(last=False)
+
+identity_cache = IdentityCache()
+
+def resolve_identity(auth_header):
+    """The TokenIdentity of a token, from the cache or GitHub's /user; None if GitHub rejects the token"""
+    fingerprint = token_fingerprint(auth_header)
+    found, identity = identity_cache.lookup(fingerprint)
+    if found:
+        return identity
+    result = fetch_cached('/user', github_headers(auth_header))
+    if result.status == 401:
+        return None
+    if result.status != 200:
+        raise http.client.HTTPException(f"GitHub answered {result.status} for /user")
+    identity = TokenIdentity(result)
+    identity_cache.put(fingerprint, identity)
+    return identity
+
+def resolve_repo_access(auth_header, identity, owner, repo):
+    """Whether the token can read a repository, and its permissions there, as a JSON-ready dict"""
+    repo_key = f"{owner}/{repo}".lower()
+    access = identity_cache.repo_access(identity, repo_key)
+    if access is not None:
+        return access
+    result = fetch_cached(f"/repos/{urllib.parse.quote(owner)}/{urllib.parse.quote(repo)}",
+                          github_headers(auth_header))
+    if result.status == 401:
+        identity_cache.reject(token_fingerprint(auth_header))
+    if result.status not in (200, 403, 404):
+        raise http.client.HTTPException(f"GitHub answered {result.status} for {repo_key}")
+    access = {"full_name": f"{owner}/{repo}", "accessible": result.status == 200, "status": result.status,
+              "permissions": json.loads(result.content).get('permissions') if result.status == 200 else None}
+    identity_cache.record_repo_access(identity, repo_key, access)
+    return access
+
+# Sub-requests of /batch calls share one pool so a large batch can't open
+# an unbounded number of upstream connections
+batch_executor = concurrent.futures.ThreadPoolExecutor(max_workers=BATCH_WORKERS,
+                                                       thread_name_prefix='batch')
+
+def run_batch_item(item, auth_header):
+    """Run one /batch sub-request and describe its outcome as a JSON-ready dict"""
+    outcome = {'id': item.get('id')} if isinstance(item, dict) and 'id' in item else {}
+    if not isinstance(item, dict) or not isinstance(item.get('path'), str):
+        return dict(outcome, status=400, error="Each request needs a 'path'")
+    
+    method = str(item.get('method', 'GET')).upper()
+    api_path = item['path']
+    if not api_path.startswith('/'):
+        return dict(outcome, status=400, error="'path' must start with /")
+    if method not in API_PROXY_METHODS or method == 'HEAD':
+        return dict(outcome, status=405, error=f"Method {method} not supported")
+    if urllib.parse.urlsplit(api_path).path.endswith(STREAMED_PATH_SUFFIXES):
+        return dict(outcome, status=400, error="Downloads can't be batched, request them from /api directly")
+    
+    headers = github_headers(auth_header)
+    try:
+        if API_PROXY_METHODS[method][1]:
+            result = fetch_cached(api_path, headers)
+        else:
+            body = None
+            if method == 'POST' or 'body' in item:
+                headers['Content-Type'] = 'application/json'
+                body = json.dumps(item.get('body', {})).encode('utf-8')
+            result = fetch_upstream(method, f'{GITHUB_API_URL}{api_path}', headers, body)
+    except RateLimited as e:
+        return dict(outcome, status=429, error=str(e), retry_after=int(e.retry_after) + 1)
+    except Exception as e:
+        logger.warning("Batch request %s %s failed: %s", method, api_path, e)
+        return dict(outcome, status=502, error=f"Upstream request failed: {e}")
+    
+    # Like a conditional GET, let the client skip bodies it already has
+    if result.status == 200 and result.etag and item.get('etag') == result.etag:
+        return dict(outcome, status=304, headers={'ETag': result.etag})
+    
+    headers = {name: value for name, value in result.headers.items() if name != 'Content-Encoding'}
+    headers.update(result.forwarded)
+    outcome.update(status=result.status, headers=headers)
+    content = result.content
+    if not content:
+        outcome['body'] = None
+    elif 'json' in result.headers.get('Content-Type', 'application/json'):
+        try:
+            outcome['body'] = json.loads(content)
+        except ValueError:
+            outcome['body'] = content.decode('utf-8', errors='replace')
+    else:
+        outcome['body'] = content.decode('utf-8', errors='replace')
+    return outcome
+
+LINK_RELATION = re.compile(r'<([^>]*)>\s*;\s*rel="([^"]*)"')
+
+def link_relations(forwarded):
+    """{rel: url} from the Link header among a result's forwarded headers"""
+    links = {}
+    for name, value in forwarded:
+        if name.lower() == 'link':
+            links.update((rel, url) for url, rel in LINK_RELATION.findall(value))
+    return links
+
+def page_number(url):
+    """The page= parameter of a pagination URL, or None"""
+    if not url:
+        return None
+    page = urllib.parse.parse_qs(urllib.parse.urlsplit(url).query).get('page', [''])[0]
+    return int(page) if page.isdigit() else None
+
+def with_page(url, page):
+    """A pagination URL pointing at another page"""
+    parts = urllib.parse.urlsplit(url)
+    query = [(name, value) for name, value in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+             if name != 'page'] + [('page', str(page))]
+    return urllib.parse.urlunsplit(parts._replace(query=urllib.parse.urlencode(query)))
+
+def proxy_page_link(url, max_pages):
+    """The /api path that continues a merged listing at a GitHub pagination URL
+
+    The client has no token for GitHub itself, so it follows the link back
+    through the proxy, merging up to max_pages more pages.
+    """
+    parts = urllib.parse.urlsplit(url)
+    api_prefix = urllib.parse.urlsplit(GITHUB_API_URL).path
+    path = parts.path[len(api_prefix):] if api_prefix and parts.path.startswith(api_prefix) else parts.path
+    query = urllib.parse.parse_qsl(parts.query, keep_blank_values=True) + [('paginate', str(max_pages))]
+    return f"/api{path}?{urllib.parse.urlencode(query)}"
+
+def page_items(result):
+    """(items, key) of a page of a list response; key is None for a bare array
+
+    GitHub returns most lists as arrays, and some (workflow runs, artifacts)
+    as an object with a count and one array.
+    """
+    data = json.loads(result.content)
+    if isinstance(data, list):
+        return data, None
+    if isinstance(data, dict):
+        keys = [key for key, value in data.items() if isinstance(value, list)]
+        if len(keys) == 1:
+            return data[keys[0]], keys[0]
+    raise ValueError("Not a list response")
+
+def pagination_option(api_path):
+    """(path without the proxy's paginate parameter, page cap or None when absent)
+
+    ``paginate`` may be empty or ``true`` for PAGINATE_MAX_PAGES, or a
+    smaller page count.
+    """
+    parts = urllib.parse.urlsplit(api_path)
+    query = urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+    values = [value for name, value in query if name == 'paginate']
+    if not values:
+        return api_path, None
+    value = values[-1].lower()
+    if value in ('', 'true'):
+        max_pages = PAGINATE_MAX_PAGES
+    elif value.isdigit() and int(value) > 0:
+        max_pages = min(int(value), PAGINATE_MAX_PAGES)
+    else:
+        raise ValueError("paginate must be true or a number of pages")
+    query = [(name, value) for name, value in query if name != 'paginate']
+    return urllib.parse.urlunsplit(parts._replace(query=urllib.parse.urlencode(query))), max_pages
+
+def fetch_page(url, headers):
+    """GET one page of a paginated list through the response cache"""
+    if not url.startswith(GITHUB_API_URL + '/'):
+        raise http.client.HTTPException(f"Pagination link leaves the API: {url}")
+    result = fetch_cached(url[len(GITHUB_API_URL):], headers)
+    if result.status != 200:
+        raise http.client.HTTPException(f"Page {page_number(url)} answered {result.status}")
+    return result
+
+def plan_pages(first, max_pages):
+    """(URLs of the pages after the first, URL of the first page left out) when the last page is known
+
+    Returns (None, None) for cursor-style pagination, whose pages can only be
+    followed one after another.
+    """
+    links = link_relations(first.forwarded)
+    next_page, last_page = page_number(links.get('next')), page_number(links.get('last'))
+    if next_page is None or last_page is None:
+        return None, None
+    urls = [with_page(links['next'], page) for page in range(next_page, last_page + 1)]
+    left_out = urls[max_pages - 1] if len(urls) >= max_pages else None
+    return urls[:max_pages - 1], left_out
+
+def paginated_results(first, headers, max_pages):
+    """Yield the pages of a list response in order, starting with the already fetched first page
+
+    When the last page is known the rest are fetched PAGINATE_CONCURRENCY at
+    a time on the batch pool; otherwise rel="next" is followed serially.
+    """
+    yield first
+    urls, _ = plan_pages(first, max_pages)
+    if urls is None:
+        result = first
+        for _ in range(max_pages - 1):
+            next_url = link_relations(result.forwarded).get('next')
+            if not next_url:
+                return
+            result = fetch_page(next_url, headers)
+            yield result
+        return
+    
+    window = deque()
+    try:
+        for url in urls:
+            window.append(batch_executor.submit(fetch_page, url, headers))
+            if len(window) >= PAGINATE_CONCURRENCY:
+                yield window.popleft().result()
+        while window:
+            yield window.popleft().result()
+    finally:
+        for future in window:
+            future.cancel()
+
+DISPATCH_PATH = re.compile(r'^/dispatch/repos/([^/]+)/([^/]+)/workflows/([^/]+)$')
+
+class DispatchResolver:
+    """Dispatches a workflow and finds the run it started
+
+    The dispatch carries a random correlation id in DISPATCH_CORRELATION_INPUT;
+    a workflow that puts it in its run-name is matched exactly. Workflows that
+    don't declare the input reject it with 422, so the dispatch is repeated
+    without it and the run is matched as the oldest unclaimed run created by
+    the same actor on the same ref since the dispatch. The runs list is
+    queried with created/event/actor/branch filters and polled with backoff.
+    """
+
+    def __init__(self, timeout=DISPATCH_RESOLVE_TIMEOUT, max_claims=DISPATCH_MAX_CLAIMS):
+        self.timeout = timeout
+        self.max_claims = max_claims
+        self.lock = threading.Lock()
+        self.claimed = OrderedDict()  # run ids already handed out
+        self.stats = {"correlated": 0, "matched_by_time": 0, "unresolved": 0}
+
+    def claim(self, run_id):
+        """Hand a run id out once, so concurrent dispatches can't resolve the same run"""
+        with self.lock:
+            if run_id in self.claimed:
+                return False
+            self.claimed[run_id] = True
+            while len(self.claimed) > self.max_claims:
+                self.claimed.popitem(last=False)
+            return True
+
+    def dispatch(self, owner, repo, workflow_id, ref, inputs, auth_header):
+        """Dispatch the workflow, returning (UpstreamResult, correlation id or None)"""
+        url = f"{GITHUB_API_URL}/repos/{owner}/{repo}/actions/workflows/{workflow_id}/dispatches"
+        headers = dict(github_headers(auth_header), **{'Content-Type': 'application/json'})
+        correlation_id = secrets.token_hex(8)
+        body = {"ref": ref, "inputs": dict(inputs, **{DISPATCH_CORRELATION_INPUT: correlation_id})}
+        result = fetch_upstream('POST', url, headers, json.dumps(body).encode('utf-8'))
+        if self.rejected_correlation_input(result):
+            logger.info("Workflow %s rejected the correlation input, dispatching without it", workflow_id)
+            body["inputs"] = inputs
+            result = fetch_upstream('POST', url, headers, json.dumps(body).encode('utf-8'))
+            correlation_id = None
+        return result, correlation_id
+
+    @staticmethod
+    def rejected_correlation_input(result):
+        """Whether a dispatch failed only because the workflow doesn't declare the correlation input
+
+        GitHub answers 422 "Unexpected inputs provided: [...]" naming it; a bad
+        ref or a missing required input is a 422 too, and must not be resent.
+        """
+        if result.status != 422:
+            return False
+        try:
+            message = json.loads(result.content).get('message') or ''
+        except (ValueError, AttributeError):
+            return False
+        return 'unexpected input' in message.lower() and DISPATCH_CORRELATION_INPUT in message
+
+    def resolve(self, owner, repo, workflow_id, ref, since, correlation_id, auth_header):
+        """Poll the filtered runs list until the dispatched run shows up, or return None"""
+        headers = github_headers(auth_header)
+        try:
+            identity = resolve_identity(auth_header)
+        except Exception as e:
+            logger.info("Could not look up the dispatching user, matching runs of any actor: %s", e)
+            identity = None
+        actor = identity.login if identity else None
+        
+        created = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(since - DISPATCH_CLOCK_SKEW))
+        # Runs report the short branch name, whichever form the dispatch used
+        branch = re.sub(r'^refs/(?:heads|tags)/', '', ref)
+        query = {"event": "workflow_dispatch", "created": f">={created}", "branch": branch, "per_page": 20}
+        if actor:
+            query["actor"] = actor
+        api_path = f"/repos/{owner}/{repo}/actions/workflows/{workflow_id}/runs?" + urllib.parse.urlencode(query)
+        
+        deadline = time.monotonic() + self.timeout
+        delay = DISPATCH_RESOLVE_FIRST_DELAY
+        while True:
+            time.sleep(min(delay, max(0.0, deadline - time.monotonic())))
+            result = fetch_cached(api_path, headers)
+            if result.status == 200:
+                runs = json.loads(result.content).get('workflow_runs', [])
+                run = self.match(runs, correlation_id)
+                if run is not None:
+                    return run
+            if time.monotonic() >= deadline:
+                with self.lock:
+                    self.stats["unresolved"] += 1
+                return None
+            delay = min(delay * 1.5, DISPATCH_RESOLVE_MAX_DELAY)
+
+    def match(self, runs, correlation_id):
+        """The dispatched run among runs (newest first), claiming it"""
+        if correlation_id:
+            for run in runs:
+                title = f"{run.get('display_title') or ''} {run.get('name') or ''}"
+                if correlation_id in title and self.claim(run['id']):
+                    with self.lock:
+                        self.stats["correlated"] += 1
+                    return run
+            return None
+        for run in reversed(runs):
+            if self.claim(run['id']):
+                with self.lock:
+                    self.stats["matched_by_time"] += 1
+                return run
+        return None
+
+dispatch_resolver = DispatchResolver()
+
+class OAuthExchangeBusy(Exception):
+    """Raised when too many token exchanges are already waiting"""
+
+# Token exchanges run on their own small pool so a slow github.com can only
+# tie up OAUTH_EXCHANGE_WORKERS sockets, and a callback never waits on it
+# past OAUTH_EXCHANGE_TIMEOUT
+oauth_exchange_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=OAUTH_EXCHANGE_WORKERS, thread_name_prefix='oauth-exchange')
+oauth_exchange_slots = threading.BoundedSemaphore(OAUTH_EXCHANGE_WORKERS * 4)
+
+def exchange_oauth_code(code, redirect_uri, deadline):
+    """Exchange an authorization code for a token, retrying transient failures
+
+    Connection errors, timeouts, 429s and 5xx responses are retried with
+    jittered backoff while the deadline allows. A code is single use, so a
+    retry after GitHub did process the first attempt comes back as
+    bad_verification_code, which is reported like any other token error.
+    """
+    token_data = urllib.parse.urlencode({
+        'client_id': GITHUB_CLIENT_ID,
+        'client_secret': GITHUB_CLIENT_SECRET,
+        'code': code,
+        'redirect_uri': redirect_uri
+    }).encode()
+    
+    attempt = 0
+    while True:
+        try:
+            with open_upstream(
+                'POST',
+                f'{GITHUB_URL}/login/oauth/access_token',
+                body=token_data,
+                headers={
+                    'Accept': 'application/json',
+                    'Content-Type': 'application/x-www-form-urlencoded'
+                },
+                timeouts=(OAUTH_CONNECT_TIMEOUT, OAUTH_READ_TIMEOUT)
+            ) as response:
+                status = response.status
+                body = response.read()
+            if status < 500 and status != 429:
+                return json.loads(body.decode())
+            error = http.client.HTTPException(f"GitHub returned {status}")
+        except (OSError, http.client.HTTPException) as e:
+            error = e
+        
+        backoff = random.uniform(0.25, 0.75) * 2 ** attempt
+        attempt += 1
+        if attempt > OAUTH_EXCHANGE_RETRIES or time.monotonic() + backoff >= deadline:
+            raise error
+        logger.warning("Token exchange attempt %d failed (%s), retrying in %.1fs", attempt, error, backoff)
+        time.sleep(backoff)
+
+def submit_oauth_exchange(code, redirect_uri):
+    """Run exchange_oauth_code on the exchange pool and wait at most OAUTH_EXCHANGE_TIMEOUT"""
+    if not oauth_exchange_slots.acquire(blocking=False):
+        raise OAuthExchangeBusy("Too many sign-ins in progress, please try again")
+    deadline = time.monotonic() + OAUTH_EXCHANGE_TIMEOUT
+    future = oauth_exchange_executor.submit(exchange_oauth_code, code, redirect_uri, deadline)
+    future.add_done_callback(lambda _: oauth_exchange_slots.release())
+    try:
+        return future.result(timeout=OAUTH_EXCHANGE_TIMEOUT)
+    except concurrent.futures.TimeoutError:
+        raise TimeoutError("GitHub did not answer the token exchange in time")
+
+# Fields of a workflow run object pushed to watchers
+RUN_SNAPSHOT_FIELDS = ('id', 'name', 'status', 'conclusion', 'html_url', 'run_attempt',
+                       'created_at', 'updated_at')
+
+WATCH_PATH = re.compile(r'^/watch/repos/([^/]+)/([^/]+)/runs/(\d+)$')
+
+def run_snapshot(run):
+    """Trim a GitHub workflow run object to the fields watchers receive"""
+    return {field: run.get(field) for field in RUN_SNAPSHOT_FIELDS}
+
+class RunWatcher:
+    """A single upstream poll loop for one workflow run, shared by all its watchers
+
+    The loop starts polling every WATCH_MIN_INTERVAL seconds and backs off
+    towards WATCH_MAX_INTERVAL while the run is unchanged, dropping back to
+    the minimum whenever it changes. It stops once the run completes or no
+    one has watched it for WATCH_IDLE_GRACE seconds. Polls go through the
+    response cache, so an unchanged run costs a 304.
+    """
+
+    def __init__(self, registry, key, api_path):
+        self.registry = registry
+        self.key = key
+        self.api_path = api_path
+        self.condition = threading.Condition()
+        self.wake = threading.Event()
+        self.snapshot = None
+        self.version = 0
+        self.error = None
+        self.finished = False
+        self.subscribers = {}
+        self.authorized = set()
+        self.last_token = None
+        self.last_seen = time.monotonic()
+        self.polls = 0
+
+    @property
+    def completed(self):
+        return self.snapshot is not None and self.snapshot.get('status') == 'completed'
+
+    def publish(self, run):
+        """Record the latest run state, waking subscribers if it changed"""
+        snapshot = run_snapshot(run)
+        with self.condition:
+            if snapshot == self.snapshot:
+                return False
+            # Webhooks and polls can report a run out of order; never step back
+            if self.snapshot is not None and (snapshot['updated_at'] or '') < (self.snapshot['updated_at'] or ''):
+                return False
+            self.snapshot = snapshot
+            self.version += 1
+            self.condition.notify_all()
+            return True
+
+    def fail(self, message):
+        """Report an error to subscribers and stop the watcher"""
+        with self.condition:
+            self.error = message
+            self.finished = True
+            self.version += 1
+            self.condition.notify_all()
+
+    def wait_for_change(self, version, timeout):
+        """Wait until the state moves past version; return (version, snapshot, error)"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.version > version or self.finished, timeout)
+            return self.version, self.snapshot, self.error
+
+    def subscribe(self, auth_header):
+        with self.condition:
+            fingerprint = token_fingerprint(auth_header)
+            self.authorized.add(fingerprint)
+            self.subscribers[fingerprint] = self.subscribers.get(fingerprint, 0) + 1
+            self.last_token = auth_header
+
+    def unsubscribe(self, auth_header):
+        with self.condition:
+            fingerprint = token_fingerprint(auth_header)
+            self.subscribers[fingerprint] -= 1
+            if not self.subscribers[fingerprint]:
+                del self.subscribers[fingerprint]
+            self.last_seen = time.monotonic()
+
+    def is_abandoned(self):
+        with self.condition:
+            return not self.subscribers and time.monotonic() - self.last_seen > WATCH_IDLE_GRACE
+
+    def run(self):
+        """Poll loop, run on the watcher's own thread"""
+        interval = WATCH_MIN_INTERVAL
+        failures = 0
+        try:
+            while not self.completed and not self.is_abandoned():
+                self.wake.wait(interval)
+                self.wake.clear()
+                self.polls += 1
+                try:
+                    result = fetch_cached(self.api_path, github_headers(self.last_token))
+                    error = None if result.status == 200 else f"GitHub API returned {result.status}"
+                except RateLimited:
+                    # Low on quota: poll as slowly as allowed rather than give up
+                    interval = WATCH_MAX_INTERVAL
+                    continue
+                except Exception as e:
+                    error = str(e)
+                
+                if error is None:
+                    failures = 0
+                    changed = self.publish(json.loads(result.content))
+                    interval = WATCH_MIN_INTERVAL if changed else min(interval * 1.5, WATCH_MAX_INTERVAL)
+                else:
+                    failures += 1
+                    logger.warning("Watcher poll failed for %s: %s", self.api_path, error)
+                    if failures >= 3:
+                        self.fail(error)
+                        break
+                    interval = min(interval * 2, WATCH_MAX_INTERVAL)
+        finally:
+            with self.condition:
+                self.finished = True
+                self.condition.notify_all()
+            self.registry.remove(self)
+            logger.info("Stopped watching %s after %d poll(s)", self.api_path, self.polls)
+
+class RunWatchRegistry:
+    """Keeps at most one live RunWatcher per workflow run"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.watchers = {}
+        self.active_requests = 0
+
+    def get(self, key):
+        with self.lock:
+            watcher = self.watchers.get(key)
+            return watcher if watcher is not None and not watcher.finished else None
+
+    def attach(self, key, api_path, auth_header, run=None):
+        """Subscribe to the run's watcher, starting one if none is live"""
+        with self.lock:
+            watcher = self.watchers.get(key)
+            start = watcher is None or watcher.finished
+            if start:
+                watcher = self.watchers[key] = RunWatcher(self, key, api_path)
+            watcher.subscribe(auth_header)
+        if run is not None:
+            watcher.publish(run)
+        if start:
+            logger.info("Watching %s", api_path)
+            threading.Thread(target=watcher.run, name=f"watch-{key[2]}", daemon=True).start()
+        return watcher
+
+    def remove(self, watcher):
+        with self.lock:
+            if self.watchers.get(watcher.key) is watcher:
+                del self.watchers[watcher.key]
+
+    def try_hold(self):
+        """Reserve one of the WATCH_MAX_STREAMS slots for a waiting request"""
+        with self.lock:
+            if self.active_requests >= WATCH_MAX_STREAMS:
+                return False
+            self.active_requests += 1
+            return True
+
+    def release_hold(self):
+        with self.lock:
+            self.active_requests -= 1
+
+run_watchers = RunWatchRegistry()
+
+# Cached API paths whose changes GitHub reports through webhooks, by topic kind
+WEBHOOK_TOPIC_PATHS = (
+    ('run', re.compile(r'^/repos/([^/]+)/([^/]+)/actions/runs/(\d+)(?:/(?:jobs|artifacts|attempts/\d+(?:/jobs)?))?$')),
+    ('runs', re.compile(r'^/repos/([^/]+)/([^/]+)/actions/(?:workflows/[^/]+/)?runs$')),
+    ('issues', re.compile(r'^/repos/([^/]+)/([^/]+)/issues(?:/\d+)?$')),
+)
+# The event a repository must be delivering for each kind of topic to be
+# answered locally; other events only mark topics as changed
+WEBHOOK_TRUSTED_EVENTS = {'run': 'workflow_run', 'runs': 'workflow_run', 'issues': 'issues'}
+WEBHOOK_EVENTS = ('ping', 'workflow_run', 'workflow_job', 'issues', 'issue_comment', 'pull_request')
+
+def webhook_topic(api_path):
+    """The webhook topic a GitHub API path belongs to, e.g. ('run', owner, repo, '42'), or None"""
+    path = urllib.parse.unquote(api_path.split('?', 1)[0])
+    for kind, pattern in WEBHOOK_TOPIC_PATHS:
+        match = pattern.match(path)
+        if match:
+            owner, repo, *rest = match.groups()
+            return (kind, owner.lower(), repo.lower(), *rest)
+    return None
+
+def verify_webhook_signature(body, signature):
+    """Check an X-Hub-Signature-256 header against the raw body and GITHUB_WEBHOOK_SECRET"""
+    if not signature or not signature.startswith('sha256='):
+        return False
+    expected = hmac.new(GITHUB_WEBHOOK_SECRET.encode('utf-8'), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(signature[len('sha256='):].encode('ascii', 'replace'), expected.encode('ascii'))
+
+class WebhookState:
+    """Run and issue changes pushed by GitHub webhooks
+
+    Keeps the latest state of each workflow run GitHub reported, and when
+    each cached topic (a run, a repository's run lists, its issues) last
+    changed. While a repository keeps delivering webhooks, a cached response
+    for a topic that has not changed since it was fetched is answered
+    without a conditional request, for up to WEBHOOK_MAX_STALENESS seconds.
+    Responses fetched within WEBHOOK_SETTLE_TIME of an event are still
+    revalidated, as GitHub's API may lag its own deliveries.
+
+    Deliveries reach a single process, so with WORKER_PROCESSES above 1
+    webhooks only wake watchers and cached responses are always revalidated.
+    """
+
+    def __init__(self, max_runs=WEBHOOK_MAX_RUNS, max_topics=WEBHOOK_MAX_TOPICS):
+        self.max_runs = max_runs
+        self.max_topics = max_topics
+        self.lock = threading.Lock()
+        self.runs = OrderedDict()  # (owner, repo, run id) -> run snapshot
+        self.changed = OrderedDict()  # topic -> when it last changed
+        self.changed_floor = float('-inf')  # latest change forgotten by eviction
+        self.sources = OrderedDict()  # (owner, repo, event) -> (trusted since, last delivery)
+        self.stats = {"served_fresh": 0, "revalidated": 0}
+
+    def record_delivery(self, owner, repo, event):
+        """Note a delivery, starting a new trust period if the repository had gone quiet"""
+        now = time.monotonic()
+        key = (owner, repo, event)
+        with self.lock:
+            trusted_since, last = self.sources.get(key, (now, None))
+            if last is None or now - last > WEBHOOK_TRUST_TTL:
+                trusted_since = now
+            self.sources[key] = (trusted_since, now)
+            self.sources.move_to_end(key)
+            while len(self.sources) > self.max_topics:
+                self.sources.popitem(last=False)
+
+    def touch(self, topic):
+        """Mark a topic as changed now"""
+        with self.lock:
+            self.changed[topic] = time.monotonic()
+            self.changed.move_to_end(topic)
+            while len(self.changed) > self.max_topics:
+                _, changed_at = self.changed.popitem(last=False)
+                self.changed_floor = max(self.changed_floor, changed_at)
+
+    def update_run(self, owner, repo, run):
+        """Record a run's reported state; return its snapshot, or None if an older delivery"""
+        snapshot = run_snapshot(run)
+        key = (owner, repo, snapshot['id'])
+        with self.lock:
+            current = self.runs.get(key)
+            if current is not None and (snapshot['updated_at'] or '') < (current['updated_at'] or ''):
+                return None
+            self.runs[key] = snapshot
+            self.runs.move_to_end(key)
+            while len(self.runs) > self.max_runs:
+                self.runs.popitem(last=False)
+            return snapshot
+
+    def is_fresh(self, api_path, cached):
+        """Whether a cached response can be answered without revalidating it"""
+        if WORKER_PROCESSES > 1 or not GITHUB_WEBHOOK_SECRET:
+            return False
+        topic = webhook_topic(api_path)
+        if topic is None:
+            return False
+        kind, owner, repo = topic[:3]
+        now = time.monotonic()
+        with self.lock:
+            trusted_since, last = self.sources.get((owner, repo, WEBHOOK_TRUSTED_EVENTS[kind]), (None, None))
+            changed_at = self.changed.get(topic, self.changed_floor)
+            fresh = (last is not None and now - last <= WEBHOOK_TRUST_TTL
+                     and cached.stored_at > max(trusted_since, changed_at + WEBHOOK_SETTLE_TIME)
+                     and now - cached.stored_at <= WEBHOOK_MAX_STALENESS)
+            self.stats["served_fresh" if fresh else "revalidated"] += 1
+            return fresh
+
+webhook_state = WebhookState()
+
+def ingest_webhook(event, payload):
+    """Apply a webhook delivery to the run-state table and cached topics; return the outcome"""
+    full_name = (payload.get('repository') or {}).get('full_name') or ''
+    owner, _, repo = full_name.lower().partition('/')
+    if event not in WEBHOOK_EVENTS or not repo:
+        return 'ignored'
+    webhook_state.record_delivery(owner, repo, event)
+    
+    if event == 'workflow_run':
+        run = payload.get('workflow_run') or {}
+        if not isinstance(run.get('id'), int):
+            return 'ignored'
+        webhook_state.touch(('run', owner, repo, str(run['id'])))
+        webhook_state.touch(('runs', owner, repo))
+        if webhook_state.update_run(owner, repo, run) is None:
+            return 'stale'
+        # Watchers of the run hear about it now instead of at their next poll
+        watcher = run_watchers.get((owner, repo, run['id']))
+        if watcher is not None:
+            watcher.publish(run)
+    elif event == 'workflow_job':
+        run_id = (payload.get('workflow_job') or {}).get('run_id')
+        if not isinstance(run_id, int):
+            return 'ignored'
+        webhook_state.touch(('run', owner, repo, str(run_id)))
+        watcher = run_watchers.get((owner, repo, run_id))
+        if watcher is not None:
+            watcher.wake.set()
+    elif event != 'ping':
+        # Pull requests are issues too, and comments change an issue's count
+        webhook_state.touch(('issues', owner, repo))
+    return 'applied'
+
+ORCHESTRATE_PATH = re.compile(r'^/orchestrate/repos/([^/]+)/([^/]+)$')
+ORCHESTRATION_PATH = re.compile(r'^/orchestrate/([A-Za-z0-9_-]+)$')
+ORCHESTRATE_STEP_ID = re.compile(r'^[A-Za-z0-9_.-]{1,64}$')
+ORCHESTRATE_RUNNING = ('dispatching', 'requested', 'waiting', 'pending', 'queued', 'in_progress')
+
+def parse_orchestration_plan(payload):
+    """Validate a deployment plan body, returning (ref, steps); raises ValueError"""
+    if not isinstance(payload, dict):
+        raise ValueError("Expected {\"ref\": ..., \"steps\": {...}}")
+    ref = payload.get('ref', 'main')
+    steps = payload.get('steps')
+    if not isinstance(ref, str) or not isinstance(steps, dict) or not steps:
+        raise ValueError("Expected {\"ref\": ..., \"steps\": {...}}")
+    if len(steps) > ORCHESTRATE_MAX_STEPS:
+        raise ValueError(f"At most {ORCHESTRATE_MAX_STEPS} steps per plan")
+    
+    plan = {}
+    for step_id, step in steps.items():
+        if not ORCHESTRATE_STEP_ID.match(step_id) or not isinstance(step, dict):
+            raise ValueError(f"Invalid step {step_id!r}")
+        workflow = step.get('workflow')
+        inputs = step.get('inputs', {})
+        needs = step.get('needs', [])
+        if isinstance(needs, str):
+            needs = [needs]
+        if not isinstance(workflow, str) or not workflow or '/' in workflow:
+            raise ValueError(f"Step {step_id!r} needs a workflow file name or id")
+        if not isinstance(inputs, dict):
+            raise ValueError(f"Inputs of step {step_id!r} must be an object")
+        if not isinstance(needs, list) or not all(isinstance(need, str) for need in needs):
+            raise ValueError(f"Needs of step {step_id!r} must be a list of step ids")
+        unknown = [need for need in needs if need not in steps or need == step_id]
+        if unknown:
+            raise ValueError(f"Step {step_id!r} needs unknown steps: {unknown}")
+        plan[step_id] = {"workflow": workflow, "inputs": inputs, "needs": list(dict.fromkeys(needs))}
+    
+    try:
+        graphlib.TopologicalSorter({step_id: step["needs"] for step_id, step in plan.items()}).prepare()
+    except graphlib.CycleError as e:
+        raise ValueError(f"Steps depend on each other in a cycle: {' -> '.join(e.args[1])}")
+    return ref, plan
+
+class Orchestration:
+    """A deployment plan being run: each workflow is dispatched as soon as the ones it needs succeed
+
+    Steps without unmet needs are dispatched at once, each on its own
+    thread, which finds the run through dispatch_resolver and follows it
+    through the run's shared RunWatcher. When a step finishes, the steps it
+    unblocks are started; steps whose needs did not all succeed are skipped,
+    as GitHub Actions does for jobs.
+    """
+
+    def __init__(self, plan_id, owner, repo, ref, plan, auth_header):
+        self.id = plan_id
+        self.owner = owner
+        self.repo = repo
+        self.ref = ref
+        self.plan = plan
+        self.auth_header = auth_header
+        self.fingerprint = token_fingerprint(auth_header)
+        self.condition = threading.Condition()
+        self.sorter = graphlib.TopologicalSorter({step_id: step["needs"] for step_id, step in plan.items()})
+        self.sorter.prepare()
+        self.steps = {step_id: {"id": step_id, "workflow": step["workflow"], "needs": step["needs"],
+                                "status": "not_started", "conclusion": None, "run_id": None,
+                                "html_url": None, "error": None} for step_id, step in plan.items()}
+        self.version = 0
+        self.created_at = datetime.now().isoformat()
+        self.deadline = time.monotonic() + ORCHESTRATE_MAX_DURATION
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.finished_at is not None
+
+    def update(self, step_id, **changes):
+        """Change a step's reported state, waking anyone waiting on the plan"""
+        with self.condition:
+            step = self.steps[step_id]
+            if all(step[name] == value for name, value in changes.items()):
+                return
+            step.update(changes)
+            self.version += 1
+            self.condition.notify_all()
+
+    def advance(self):
+        """Start every step whose needs are now settled, skipping those whose needs failed"""
+        started = []
+        with self.condition:
+            ready = self.sorter.get_ready()
+            while ready:
+                for step_id in ready:
+                    step = self.steps[step_id]
+                    blocked = [need for need in step["needs"] if self.steps[need]["conclusion"] != 'success']
+                    if blocked:
+                        step.update(status="skipped", error=f"Needs {', '.join(blocked)} to succeed")
+                        self.sorter.done(step_id)
+                    else:
+                        step["status"] = "dispatching"
+                        started.append(step_id)
+                ready = self.sorter.get_ready()
+            if not self.sorter.is_active() and self.finished_at is None:
+                self.finished_at = time.monotonic()
+                logger.info("Orchestration %s finished: %s", self.id, self.conclusion())
+            self.version += 1
+            self.condition.notify_all()
+        for step_id in started:
+            threading.Thread(target=self.run_step, args=(step_id,), name=f"orchestrate-{self.id}-{step_id}",
+                             daemon=True).start()
+
+    def run_step(self, step_id):
+        """Dispatch one workflow and follow its run to completion, on the step's own thread"""
+        step = self.plan[step_id]
+        try:
+            since = time.time()
+            result, correlation_id = dispatch_resolver.dispatch(self.owner, self.repo, step["workflow"], self.ref,
+                                                                step["inputs"], self.auth_header)
+            if result.status >= 300:
+                try:
+                    message = json.loads(result.content).get('message')
+                except (ValueError, AttributeError):
+                    message = None
+                raise http.client.HTTPException(f"Dispatch failed with {result.status}: {message or 'no details'}")
+            run = dispatch_resolver.resolve(self.owner, self.repo, step["workflow"], self.ref, since,
+                                            correlation_id, self.auth_header)
+            if run is None:
+                raise http.client.HTTPException("Dispatched, but the run could not be found")
+            self.update(step_id, run_id=run['id'], html_url=run.get('html_url'), status=run.get('status'))
+            self.follow_run(step_id, run)
+        except Exception as e:
+            logger.warning("Orchestration %s step %s failed: %s", self.id, step_id, e)
+            self.update(step_id, status="failed", error=str(e))
+        finally:
+            with self.condition:
+                self.sorter.done(step_id)
+            self.advance()
+
+    def follow_run(self, step_id, run):
+        """Mirror a run's status into the step until it completes"""
+        key = (self.owner.lower(), self.repo.lower(), run['id'])
+        api_path = f"/repos/{self.owner}/{self.repo}/actions/runs/{run['id']}"
+        watcher = run_watchers.attach(key, api_path, self.auth_header, run)
+        try:
+            version = 0
+            while True:
+                version, snapshot, error = watcher.wait_for_change(version, WATCH_HEARTBEAT_INTERVAL)
+                if error:
+                    raise http.client.HTTPException(error)
+                if snapshot is not None:
+                    self.update(step_id, status=snapshot['status'], conclusion=snapshot['conclusion'],
+                                html_url=snapshot['html_url'])
+                    if snapshot['status'] == 'completed':
+                        return
+                if time.monotonic() > self.deadline:
+                    raise TimeoutError(f"Run {run['id']} did not complete within {ORCHESTRATE_MAX_DURATION:g}s")
+                if watcher.finished:
+                    # The poll loop stopped without seeing the run complete; start another
+                    watcher.unsubscribe(self.auth_header)
+                    watcher = run_watchers.attach(key, api_path, self.auth_header)
+                    version = 0
+        finally:
+            watcher.unsubscribe(self.auth_header)
+
+    def conclusion(self):
+        """success once every step succeeded, failure once any did not, None while undecided"""
+        steps = self.steps.values()
+        if any(step["status"] in ("failed", "skipped") or step["conclusion"] not in (None, 'success')
+               for step in steps):
+            return 'failure'
+        return 'success' if all(step["conclusion"] == 'success' for step in steps) else None
+
+    def wait_for_change(self, version, timeout):
+        with self.condition:
+            self.condition.wait_for(lambda: self.version > version or self.finished, timeout)
+
+    def describe(self):
+        """The plan's aggregated progress as a JSON-ready dict"""
+        with self.condition:
+            steps = [dict(step) for step in self.steps.values()]
+            progress = {"total": len(steps), "not_started": 0, "running": 0, "succeeded": 0, "failed": 0, "skipped": 0}
+            for step in steps:
+                if step["status"] in ("not_started", "skipped"):
+                    progress[step["status"]] += 1
+                elif step["status"] in ORCHESTRATE_RUNNING:
+                    progress["running"] += 1
+                elif step["conclusion"] == 'success':
+                    progress["succeeded"] += 1
+                else:
+                    progress["failed"] += 1
+            return {"id": self.id, "repository": f"{self.owner}/{self.repo}", "ref": self.ref,
+                    "status": "completed" if self.finished else "in_progress", "conclusion": self.conclusion(),
+                    "version": self.version, "created_at": self.created_at, "progress": progress, "steps": steps}
+
+class OrchestrationRegistry:
+    """Running and recently finished deployment plans, readable only by the token that started them"""
+
+    def __init__(self, max_active=ORCHESTRATE_MAX_ACTIVE, retention=ORCHESTRATE_RETENTION):
+        self.max_active = max_active
+        self.retention = retention
+        self.lock = threading.Lock()
+        self.plans = OrderedDict()
+        self.stats = {"started": 0, "rejected": 0}
+
+    def start(self, owner, repo, ref, plan, auth_header):
+        """Create and start an Orchestration, or return None if too many are running"""
+        with self.lock:
+            now = time.monotonic()
+            for plan_id, orchestration in list(self.plans.items()):
+                if orchestration.finished and now - orchestration.finished_at > self.retention:
+                    del self.plans[plan_id]
+            if sum(not orchestration.finished for orchestration in self.plans.values()) >= self.max_active:
+                self.stats["rejected"] += 1
+                return None
+            orchestration = Orchestration(secrets.token_urlsafe(12), owner, repo, ref, plan, auth_header)
+            self.plans[orchestration.id] = orchestration
+            self.stats["started"] += 1
+        logger.info("Orchestration %s started for %s/%s: %s", orchestration.id, owner, repo, ', '.join(plan))
+        orchestration.advance()
+        return orchestration
+
+    def get(self, plan_id, auth_header):
+        with self.lock:
+            orchestration = self.plans.get(plan_id)
+        if orchestration is None or orchestration.fingerprint != token_fingerprint(auth_header):
+            return None
+        return orchestration
+
+orchestrations = OrchestrationRegistry()
+
+ARTIFACT_SUMMARY_FIELDS = ('id', 'name', 'size_in_bytes', 'expired', 'created_at')
+
+STATUS_PATH = re.compile(r'^/status/repos/([^/]+)/([^/]+)/workflows/([^/]+)$')
+STATUS_MAX_RUNS = 30
+STATUS_MAX_ARTIFACT_RUNS = 5
+
+def workflow_status(owner, repo, workflow_id, headers, per_page=10, artifact_runs=0):
+    """Latest runs of a workflow, and the artifacts of its newest completed runs
+
+    Built from the runs list plus one artifacts call per requested completed
+    run, all through the response cache so unchanged data is revalidated with
+    conditional GETs. The result is trimmed to the fields the UI reads and
+    carries its own ETag.
+    """
+    base = f"/repos/{urllib.parse.quote(owner)}/{urllib.parse.quote(repo)}/actions"
+    result = fetch_cached(f"{base}/workflows/{urllib.parse.quote(workflow_id)}/runs?per_page={per_page}", headers)
+    if result.status != 200:
+        return result
+    
+    runs = [run_snapshot(run) for run in json.loads(result.content).get('workflow_runs', [])]
+    completed = [run for run in runs if run['status'] == 'completed'][:artifact_runs]
+    futures = {run['id']: batch_executor.submit(fetch_cached, f"{base}/runs/{run['id']}/artifacts", headers)
+               for run in completed}
+    for run in completed:
+        artifacts = futures[run['id']].result()
+        if artifacts.status == 200:
+            run['artifacts'] = [{field: artifact.get(field) for field in ARTIFACT_SUMMARY_FIELDS}
+                                for artifact in json.loads(artifacts.content).get('artifacts', [])]
+        else:
+            run['artifacts'] = None
+            run['artifacts_status'] = artifacts.status
+    
+    body = json.dumps({"workflow_id": workflow_id, "workflow_runs": runs}).encode('utf-8')
+    etag = f'W/"{hashlib.sha256(body).hexdigest()[:32]}"'
+    return UpstreamResult(200, {'Content-Type': 'application/json', 'ETag': etag}, body)
+
+ARTIFACT_FILE_PATH = re.compile(r'^/artifacts/repos/([^/]+)/([^/]+)/(\d+)$')
+
+class ArtifactStore:
+    """Files extracted from workflow artifacts, shared by everyone who can read them
+
+    Artifacts never change, so an extracted file is cached without a TTL,
+    keyed by repository, artifact id and file name. A token is only served a
+    cached file once GitHub has confirmed it can read that artifact; those
+    grants are remembered (up to ARTIFACT_MAX_GRANTS) so repeat views by the
+    same user need no upstream call at all.
+    """
+
+    def __init__(self, max_bytes=ARTIFACT_CACHE_MAX_BYTES, max_entries=ARTIFACT_CACHE_MAX_ENTRIES,
+                 max_grants=ARTIFACT_MAX_GRANTS):
+        self.files = ResponseCache(max_bytes=max_bytes, max_entries=max_entries, ttl=float('inf'))
+        self.max_grants = max_grants
+        self.lock = threading.Lock()
+        self.grants = OrderedDict()
+        self.stats = {"downloads": 0, "access_checks": 0}
+
+    def is_granted(self, fingerprint, artifact_key):
+        with self.lock:
+            key = (fingerprint, artifact_key)
+            if key in self.grants:
+                self.grants.move_to_end(key)
+                return True
+            return False
+
+    def grant(self, fingerprint, artifact_key):
+        with self.lock:
+            self.grants[(fingerprint, artifact_key)] = True
+            self.grants.move_to_end((fingerprint, artifact_key))
+            while len(self.grants) > self.max_grants:
+                self.grants.popitem(last=False)
+
+artifact_store = ArtifactStore()
+
+def choose_artifact_member(names, requested=None):
+    """Pick the file to extract, preferring JSON and then text like the frontend does"""
+    files = [name for name in names if not name.endswith('/')]
+    if requested:
+        return requested if requested in files else None
+    for name in files:
+        if name.lower().endswith('.json'):
+            return name
+    for name in files:
+        base = name.rsplit('/', 1)[-1]
+        if base.lower().endswith(('.txt', '.log')) or '.' not in base:
+            return name
+    return None
+
+def extract_artifact_file(owner, repo, artifact_id, requested, auth_header):
+    """One file of an artifact as an UpstreamResult holding a JSON envelope
+
+    Concurrent first requests for the same file share one download, whoever
+    makes them; a token other than the one that downloaded it is still only
+    served the file once GitHub confirms it can read the artifact.
+    """
+    artifact_key = (owner.lower(), repo.lower(), artifact_id)
+    cache_key = artifact_key + (requested or '',)
+    fingerprint = token_fingerprint(auth_header)
+    
+    def download():
+        try:
+            return fingerprint, download_artifact_file(owner, repo, artifact_id, requested, auth_header), None
+        except RateLimited as e:
+            return fingerprint, None, e
+    
+    cached = artifact_store.files.get(cache_key)
+    if cached is None:
+        downloaded_by, cached, error = request_coalescer.run(('artifact-file',) + cache_key, download)
+        if downloaded_by == fingerprint:
+            if error is not None:
+                raise error
+            return cached
+        if error is not None or cached.status != 200:
+            # Another token's download failed, which says nothing about this one
+            return download_artifact_file(owner, repo, artifact_id, requested, auth_header)
+    
+    if artifact_store.is_granted(fingerprint, artifact_key):
+        return cached
+    # Someone else extracted it; make sure this token may see the artifact
+    with artifact_store.lock:
+        artifact_store.stats["access_checks"] += 1
+    check = fetch_cached(f"/repos/{owner}/{repo}/actions/artifacts/{artifact_id}", github_headers(auth_header))
+    if check.status != 200:
+        return check
+    artifact_store.grant(fingerprint, artifact_key)
+    return cached
+
+def download_artifact_file(owner, repo, artifact_id, requested, auth_header):
+    """Download an artifact with a token and extract one file, keeping it in artifact_store
+
+    The zip is downloaded into memory, or a temporary file once it exceeds
+    ARTIFACT_SPOOL_BYTES, and only the requested member is decompressed.
+    """
+    artifact_key = (owner.lower(), repo.lower(), artifact_id)
+    zip_url = f"{GITHUB_API_URL}/repos/{owner}/{repo}/actions/artifacts/{artifact_id}/zip"
+    with tempfile.SpooledTemporaryFile(max_size=ARTIFACT_SPOOL_BYTES) as spool:
+        with open_github('GET', zip_url, github_headers(auth_header)) as response:
+            if response.status != 200:
+                kept = {name: response.getheader(name) for name in CACHED_HEADERS if response.getheader(name)}
+                return UpstreamResult(response.status, kept, response.read())
+            with artifact_store.lock:
+                artifact_store.stats["downloads"] += 1
+            downloaded = 0
+            while True:
+                chunk = response.read(STREAM_CHUNK_SIZE)
+                if not chunk:
+                    break
+                downloaded += len(chunk)
+                if downloaded > ARTIFACT_MAX_DOWNLOAD_BYTES:
+                    return error_result(413, f"Artifact is larger than {ARTIFACT_MAX_DOWNLOAD_BYTES} bytes")
+                spool.write(chunk)
+        
+        try:
+            with zipfile.ZipFile(spool) as archive:
+                names = archive.namelist()
+                member = choose_artifact_member(names, requested)
+                if member is None:
+                    return error_result(404, "No matching file in artifact")
+                info = archive.getinfo(member)
+                if info.file_size > ARTIFACT_MAX_FILE_BYTES:
+                    return error_result(413, f"{member} is larger than {ARTIFACT_MAX_FILE_BYTES} bytes")
+                with archive.open(info) as extracted:
+                    content = extracted.read(ARTIFACT_MAX_FILE_BYTES + 1)
+        except zipfile.BadZipFile:
+            return error_result(502, "Artifact is not a valid zip file")
+    
+    if len(content) > ARTIFACT_MAX_FILE_BYTES:
+        return error_result(413, f"{member} is larger than {ARTIFACT_MAX_FILE_BYTES} bytes")
+    
+    body = json.dumps({
+        "artifact_id": int(artifact_id),
+        "file": member,
+        "files": names,
+        "content": content.decode('utf-8', errors='replace')
+    }).encode('utf-8')
+    etag = f'"artifact-{artifact_id}-{hashlib.sha256(body).hexdigest()[:16]}"'
+    result = UpstreamResult(200, {'Content-Type': 'application/json', 'ETag': etag}, body)
+    artifact_store.files.put(artifact_key + (requested or '',), result)
+    artifact_store.grant(token_fingerprint(auth_header), artifact_key)
+    return result
+
+def error_result(status, message):
+    """A proxy-generated JSON error in the shape of a buffered GitHub response"""
+    return UpstreamResult(status, {'Content-Type': 'application/json'},
+                          json.dumps({"message": message}).encode('utf-8'))
+
+class OriginPolicy:
+    """CORS origin policy compiled once at startup
+
+    An origin is allowed when it is listed exactly in ALLOWED_ORIGINS, or when
+    its hostname is one of ALLOWED_ORIGIN_SUFFIXES or a subdomain of one
+    (``https://me.github.io`` matches ``github.io``, ``https://github.io.evil.com``
+    does not). Allowed origins are echoed back with credentials; any other
+    origin gets the wildcard without them. The rendered header block and the
+    complete preflight response for each origin are kept in a bounded LRU, so
+    a response only appends one bytes object and a preflight is one write.
+    """
+    def __init__(self, allowed_origins, allowed_suffixes, cache_size=CORS_HEADER_CACHE_SIZE,
+                 protocol_version='HTTP/1.0'):
+        self.allow_all = '*' in allowed_origins
+        self.exact = frozenset(self.normalize(origin) for origin in allowed_origins if origin != '*')
+        suffixes = {suffix.strip().lower().lstrip('.') for suffix in allowed_suffixes if suffix.strip()}
+        self.hosts = frozenset(suffixes)
+        self.subdomain_suffixes = tuple('.' + suffix for suffix in sorted(suffixes))
+        self.cache_size = cache_size
+        self.preflight_status_line = f"{protocol_version} 204 No Content\r\n".encode('latin-1')
+        self.cache = OrderedDict()  # origin -> (rendered header block, preflight response)
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+        
+        # Every block varies with Origin, including the wildcard one
+        common = [
+            ('Vary', 'Origin'),
+            ('Access-Control-Allow-Methods', CORS_ALLOW_METHODS),
+            ('Access-Control-Allow-Headers', CORS_ALLOW_HEADERS),
+            ('Access-Control-Max-Age', str(CORS_MAX_AGE)),
+            ('Access-Control-Expose-Headers', CORS_EXPOSE_HEADERS),
+        ]
+        self.common_headers = common
+        self.wildcard = self.compile(self.render([('Access-Control-Allow-Origin', '*')] + common))
+    
+    @staticmethod
+    def normalize(origin):
+        return origin.strip().rstrip('/').lower()
+    
+    @staticmethod
+    def render(headers):
+        """Encode headers the way BaseHTTPRequestHandler.send_header does"""
+        return b''.join(f"{name}: {value}\r\n".encode('latin-1', 'strict') for name, value in headers)
+    
+    def allows(self, origin):
+        """Whether an origin may be echoed back with credentials"""
+        if self.allow_all:
+            return True
+        normalized = self.normalize(origin)
+        if normalized in self.exact:
+            return True
+        parts = urllib.parse.urlsplit(normalized)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            return False
+        return parts.hostname in self.hosts or parts.hostname.endswith(self.subdomain_suffixes)
+    
+    def compile(self, block):
+        """Pair a header block with the full preflight response built from it"""
+        return block, self.preflight_status_line + block + b"Content-Length: 0\r\n\r\n"
+    
+    def lookup(self, origin):
+        """(header block, preflight response) for a request's Origin header, which may be missing"""
+        if not origin:
+            return self.wildcard
+        with self.lock:
+            entry = self.cache.get(origin)
+            if entry is not None:
+                self.cache.move_to_end(origin)
+                self.stats['hits'] += 1
+                return entry
+            self.stats['misses'] += 1
+        
+        if self.allows(origin):
+            entry = self.compile(self.render([
+                ('Access-Control-Allow-Origin', origin),
+                ('Access-Control-Allow-Credentials', 'true'),
+            ] + self.common_headers))
+        else:
+            entry = self.wildcard
+        
+        with self.lock:
+            self.cache[origin] = entry
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return entry
+    
+    def header_block(self, origin):
+        """Rendered CORS headers to add to a response"""
+        return self.lookup(origin)[0]
+    
+    def preflight_response(self, origin):
+        """Complete response to a CORS preflight, status line included"""
+        return self.lookup(origin)[1]
+
+origin_policy = OriginPolicy(ALLOWED_ORIGINS, ALLOWED_ORIGIN_SUFFIXES, protocol_version='HTTP/1.1')
+
+def collect_component_metrics():
+    """Scrape-time gauges and counters for the caches, pools and schedulers"""
+    with response_cache.lock:
+        yield 'gauge', 'proxy_response_cache_entries', (), len(response_cache.entries)
+        yield 'gauge', 'proxy_response_cache_bytes', (), response_cache.bytes
+        for event, count in response_cache.stats.items():
+            yield 'counter', 'proxy_response_cache_events_total', (('event', event),), count
+    with upstream_pool.lock:
+        for (scheme, host, port), idle in upstream_pool.idle.items():
+            yield 'gauge', 'proxy_upstream_pool_idle_connections', (('host', host),), len(idle)
+        for event, count in upstream_pool.stats.items():
+            yield 'counter', 'proxy_upstream_pool_connections_total', (('event', event),), count
+    with request_coalescer.lock:
+        for role, count in request_coalescer.stats.items():
+            yield 'counter', 'proxy_coalesced_requests_total', (('role', role),), count
+        yield 'gauge', 'proxy_coalesced_requests_in_flight', (), len(request_coalescer.flights)
+    with rate_limiter.lock:
+        for event, count in rate_limiter.stats.items():
+            yield 'counter', 'proxy_rate_limit_events_total', (('event', event),), count
+    with run_watchers.lock:
+        yield 'gauge', 'proxy_run_watchers', (), len(run_watchers.watchers)
+        yield 'gauge', 'proxy_watch_requests_held', (), run_watchers.active_requests
+    for handler in logging.getLogger('oauth_proxy').handlers:
+        if isinstance(handler, DroppingQueueHandler):
+            yield 'counter', 'proxy_log_records_dropped_total', (), handler.dropped
+    with dispatch_resolver.lock:
+        for outcome, count in dispatch_resolver.stats.items():
+            yield 'counter', 'proxy_dispatch_resolutions_total', (('outcome', outcome),), count
+    with artifact_store.files.lock:
+        yield 'gauge', 'proxy_artifact_cache_entries', (), len(artifact_store.files.entries)
+        yield 'gauge', 'proxy_artifact_cache_bytes', (), artifact_store.files.bytes
+        for event, count in artifact_store.files.stats.items():
+            yield 'counter', 'proxy_artifact_cache_events_total', (('event', event),), count
+    with artifact_store.lock:
+        for event, count in artifact_store.stats.items():
+            yield 'counter', 'proxy_artifact_cache_events_total', (('event', event),), count
+    with identity_cache.lock:
+        yield 'gauge', 'proxy_identity_cache_entries', (), len(identity_cache.entries)
+        for event, count in identity_cache.stats.items():
+            yield 'counter', 'proxy_identity_cache_events_total', (('event', event),), count
+    with orchestrations.lock:
+        running = sum(not orchestration.finished for orchestration in orchestrations.plans.values())
+        yield 'gauge', 'proxy_orchestrations', (('state', 'running'),), running
+        yield 'gauge', 'proxy_orchestrations', (('state', 'finished'),), len(orchestrations.plans) - running
+        for event, count in orchestrations.stats.items():
+            yield 'counter', 'proxy_orchestrations_total', (('event', event),), count
+    with webhook_state.lock:
+        yield 'gauge', 'proxy_webhook_runs', (), len(webhook_state.runs)
+        for event, count in webhook_state.stats.items():
+            yield 'counter', 'proxy_webhook_cache_checks_total', (('result', event),), count
+    with origin_policy.lock:
+        yield 'gauge', 'proxy_cors_header_cache_entries', (), len(origin_policy.cache)
+        for event, count in origin_policy.stats.items():
+            yield 'counter', 'proxy_cors_header_cache_events_total', (('event', event),), count
+
+metrics.collectors.append(collect_component_metrics)
 
 class OAuthProxyHandler(http.server.SimpleHTTPRequestHandler):
+    # Keep client connections open between requests; every response is
+    # framed by Content-Length or chunked encoding
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes, don't let Nagle hold the body back
+    disable_nagle_algorithm = True
+    # Drop clients that stop sending so they can't pin a worker thread
+    timeout = CLIENT_SOCKET_TIMEOUT
+
     def __init__(self, *args, **kwargs):
         # For production, don't serve static files from docs directory
         # Instead, handle all requests programmatically
         super().__init__(*args, directory=None, **kwargs)
     
+    def handle(self):
+        """Serve requests on a connection until it is closed
+
+        Each connection holds a worker thread, so it is only kept open while
+        that is cheap: it is closed after KEEPALIVE_MAX_REQUESTS requests, when
+        no request arrives within KEEPALIVE_TIMEOUT, when a request body was
+        left unread, and after any response sent while other connections wait
+        for a worker or the server is shutting down. Except for the idle
+        timeout, the response announces it with Connection: close.
+        """
+        self.requests_handled = 0
+        self.close_connection = True
+        while True:
+            self.body_read = False
+            self.handle_one_request()
+            self.requests_handled += 1
+            if self.close_connection or not self.request_body_done() or not self.await_next_request():
+                break
+    
+    def keep_alive_exhausted(self):
+        """Whether the connection should close after the request being handled"""
+        return (self.requests_handled + 1 >= KEEPALIVE_MAX_REQUESTS or self.server.stopping
+                or not self.server.pending.empty() or not self.request_body_done())
+    
+    def request_body_done(self):
+        """Whether the request body, if any, was read, so the next request starts at the right byte"""
+        if self.body_read:
+            return True
+        if 'Transfer-Encoding' in self.headers:
+            return False
+        try:
+            return int(self.headers.get('Content-Length') or 0) == 0
+        except ValueError:
+            return False
+    
+    def await_next_request(self):
+        """Wait up to KEEPALIVE_TIMEOUT for the next request on the connection"""
+        self.connection.settimeout(KEEPALIVE_TIMEOUT)
+        try:
+            ready = bool(self.rfile.peek(1))
+        except OSError:
+            ready = False
+        self.connection.settimeout(self.timeout)
+        return ready
+    
+    def read_body(self):
+        """Read the request body (Content-Length framed)"""
+        self.body_read = True
+        content_length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(content_length) if content_length > 0 else b''
+    
+    @instrumented
     def do_GET(self):
         """Handle GET requests"""
         parsed_path = urllib.parse.urlparse(self.path)
@@ -64,108 +2614,130 @@ class OAuthProxyHandler(http.server.SimpleHTTPRequestHandler):
             self.handle_root()
         elif parsed_path.path == "/health":
             self.handle_health_check()
+        elif parsed_path.path == "/metrics":
+            self.handle_metrics()
         elif parsed_path.path == "/oauth/authorize":
             self.handle_oauth_authorize()
         elif parsed_path.path == "/oauth/callback":
             self.handle_oauth_callback()
         elif parsed_path.path.startswith("/api/"):
             self.handle_api_proxy()
+        elif parsed_path.path.startswith("/watch/"):
+            self.handle_watch_run()
+        elif parsed_path.path.startswith("/status/"):
+            self.handle_workflow_status()
+        elif parsed_path.path.startswith("/artifacts/"):
+            self.handle_artifact_file()
+        elif parsed_path.path == "/auth/check":
+            self.handle_auth_check()
+        elif parsed_path.path.startswith("/orchestrate/"):
+            self.handle_orchestration_status()
         else:
             self.handle_404()
     
+    @instrumented
     def do_POST(self):
         """Handle POST requests"""
         parsed_path = urllib.parse.urlparse(self.path)
         
         if parsed_path.path.startswith("/api/"):
             self.handle_api_proxy()
+        elif parsed_path.path == "/batch":
+            self.handle_batch()
+        elif parsed_path.path.startswith("/dispatch/"):
+            self.handle_dispatch()
+        elif parsed_path.path == "/webhooks/github":
+            self.handle_github_webhook()
+        elif parsed_path.path.startswith("/orchestrate/"):
+            self.handle_orchestrate()
+        else:
+            self.handle_404()
+    
+    @instrumented
+    def do_PUT(self):
+        """Handle PUT, PATCH, DELETE and HEAD requests, which only the API proxy accepts"""
+        if urllib.parse.urlparse(self.path).path.startswith("/api/"):
+            self.handle_api_proxy()
         else:
             self.handle_404()
     
+    do_PATCH = do_DELETE = do_HEAD = do_PUT
+    
     def do_OPTIONS(self):
         """Handle preflight CORS requests"""
-        print(f"🔄 OPTIONS request for: {self.path}")
-        print(f"🔄 Origin: {self.headers.get('Origin')}")
-        
-        # Always handle OPTIONS requests locally, never forward to external APIs
-        self.send_response(200)
-        self.add_cors_headers()
-        self.end_headers()
+        # Preflights are about half of all traffic and never depend on the path:
+        # write the pre-rendered response for this origin and skip routing,
+        # access logging and request instrumentation
+        response = origin_policy.preflight_response(self.headers.get('Origin'))
+        if self.keep_alive_exhausted():
+            response = response[:-2] + b"Connection: close\r\n\r\n"
+            self.close_connection = True
+        self.wfile.write(response)
+        metrics.inc('proxy_preflight_requests_total')
     
     def add_cors_headers(self):
         """Add CORS headers to response"""
-        origin = self.headers.get('Origin')
-        
-        print(f"🔄 Adding CORS headers for origin: {origin}")
-        
-        # Always allow the requesting origin for development/testing
-        # In production, this should be more restrictive
-        if origin:
-            # Allow common development and GitHub Pages origins
-            allowed_patterns = [
-                'localhost',
-                '127.0.0.1',
-                'github.io',
-                'azurewebsites.net',
-                'herokuapp.com',
-                'vercel.app',
-                'netlify.app'
-            ]
-            
-            # Check if the origin matches any allowed pattern or is in the configured list
-            if (ALLOWED_ORIGINS == ['*'] or 
-                origin in ALLOWED_ORIGINS or 
-                any(pattern in origin for pattern in allowed_patterns)):
-                self.send_header('Access-Control-Allow-Origin', origin)
-                print(f"✅ Allowing origin: {origin}")
-            else:
-                # Fallback to wildcard for now (can be made more restrictive later)
-                self.send_header('Access-Control-Allow-Origin', '*')
-                print(f"⚠️ Using wildcard for origin: {origin}")
-        else:
-            self.send_header('Access-Control-Allow-Origin', '*')
-            print("⚠️ No origin header, using wildcard")
-            
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, PUT, DELETE, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Authorization, Content-Type, Accept, Origin, X-Requested-With')
-        self.send_header('Access-Control-Allow-Credentials', 'true')
-        self.send_header('Access-Control-Max-Age', '86400')  # Cache preflight for 24 hours
+        # The block is pre-rendered by origin_policy; append it as send_header would
+        if self.request_version != 'HTTP/0.9':
+            if not hasattr(self, '_headers_buffer'):
+                self._headers_buffer = []
+            self._headers_buffer.append(origin_policy.header_block(self.headers.get('Origin')))
     
     def handle_root(self):
         """Handle root path"""
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
-        self.add_cors_headers()
-        self.end_headers()
-        
         response = {
             "status": "ok",
             "service": "GitHub OAuth Proxy Server",
             "version": "1.0.1",
             "endpoints": {
                 "health": "/health",
+                "metrics": "/metrics",
                 "oauth_authorize": "/oauth/authorize",
                 "oauth_callback": "/oauth/callback",
-                "api_proxy": "/api/*"
+                "auth_check": "/auth/check?repo={owner}/{repo}",
+                "api_proxy": "/api/*",
+                "api_proxy_paginated": "/api/*?paginate=true",
+                "batch": "/batch",
+                "dispatch": "/dispatch/repos/{owner}/{repo}/workflows/{workflow_id}",
+                "watch_run": "/watch/repos/{owner}/{repo}/runs/{run_id}",
+                "workflow_status": "/status/repos/{owner}/{repo}/workflows/{workflow_id}",
+                "artifact_file": "/artifacts/repos/{owner}/{repo}/{artifact_id}",
+                "github_webhook": "/webhooks/github",
+                "orchestrate": "/orchestrate/repos/{owner}/{repo}",
+                "orchestration_status": "/orchestrate/{orchestration_id}"
             }
         }
         
-        self.wfile.write(json.dumps(response, indent=2).encode())
+        self.send_response(200)
+        self.send_payload('application/json', json.dumps(response, indent=2).encode())
     
     def handle_health_check(self):
         """Handle health check endpoint"""
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
-        self.add_cors_headers()
-        self.end_headers()
-        
         response = {
             "status": "healthy",
             "timestamp": datetime.now().isoformat(),
             "service": "GitHub OAuth Proxy Server"
         }
         
-        self.wfile.write(json.dumps(response).encode())
+        self.send_response(200)
+        self.send_payload('application/json', json.dumps(response).encode())
+    
+    def handle_metrics(self):
+        """Export Prometheus metrics"""
+        body = metrics.render().encode()
+        self.send_response(200)
+        self.send_header('Content-type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+    
+    def send_response(self, code, message=None):
+        """Remember the status code for the request metrics, and announce a closing connection"""
+        self.response_status = code
+        super().send_response(code, message)
+        if self.request_version >= 'HTTP/1.1' and self.keep_alive_exhausted():
+            self.send_header('Connection', 'close')
     
     def handle_oauth_authorize(self):
         """Initiate GitHub OAuth flow"""
@@ -188,18 +2760,19 @@ class OAuthProxyHandler(http.server.SimpleHTTPRequestHandler):
                 'allow_signup': 'true'
             }
             
-            github_oauth_url = 'https://github.com/login/oauth/authorize?' + urllib.parse.urlencode(github_oauth_params)
+            github_oauth_url = f'{GITHUB_URL}/login/oauth/authorize?' + urllib.parse.urlencode(github_oauth_params)
             
-            print(f"🔐 Redirecting to GitHub OAuth: {github_oauth_url}")
+            logger.info("Redirecting to GitHub OAuth: %s", github_oauth_url)
             
             # Redirect to GitHub OAuth
             self.send_response(302)
             self.send_header('Location', github_oauth_url)
+            self.send_header('Content-Length', '0')
             self.add_cors_headers()
             self.end_headers()
             
         except Exception as e:
-            print(f"❌ Error in OAuth authorize: {e}")
+            logger.exception("Error in OAuth authorize: %s", e)
             self.send_error_response(500, f"OAuth authorization error: {str(e)}")
     
     def handle_oauth_callback(self):
@@ -213,7 +2786,7 @@ class OAuthProxyHandler(http.server.SimpleHTTPRequestHandler):
             error = query_params.get('error', [None])[0]
             if error:
                 error_description = query_params.get('error_description', ['Unknown error'])[0]
-                print(f"❌ OAuth error: {error} - {error_description}")
+                logger.warning("OAuth error: %s - %s", error, error_description)
                 self.send_oauth_result_page(None, f"OAuth error: {error_description}")
                 return
             
@@ -222,62 +2795,40 @@ class OAuthProxyHandler(http.server.SimpleHTTPRequestHandler):
             state = query_params.get('state', [None])[0]
             
             if not code:
-                print("❌ No authorization code received")
+                logger.warning("No authorization code received")
                 self.send_oauth_result_page(None, "No authorization code received")
                 return
             
-            print(f"✅ Received authorization code: {code[:10]}...")
-            
-            # Exchange code for access token
-            token_data = {
-                'client_id': GITHUB_CLIENT_ID,
-                'client_secret': GITHUB_CLIENT_SECRET,
-                'code': code,
-                'redirect_uri': f"{self.get_base_url()}/oauth/callback"
-            }
-            
-            token_request = urllib.request.Request(
-                'https://github.com/login/oauth/access_token',
-                data=urllib.parse.urlencode(token_data).encode(),
-                headers={
-                    'Accept': 'application/json',
-                    'Content-Type': 'application/x-www-form-urlencoded'
-                }
-            )
+            logger.info("Received authorization code: %s...", code[:10])
             
-            with urllib.request.urlopen(token_request) as response:
-                token_response = json.loads(response.read().decode())
+            # Exchange code for access token (bounded by OAUTH_EXCHANGE_TIMEOUT)
+            token_response = submit_oauth_exchange(code, f"{self.get_base_url()}/oauth/callback")
             
             # Check for token error
             if 'error' in token_response:
                 error_msg = token_response.get('error_description', token_response['error'])
-                print(f"❌ Token exchange error: {error_msg}")
+                logger.warning("Token exchange error: %s", error_msg)
                 self.send_oauth_result_page(None, f"Token exchange error: {error_msg}")
                 return
             
             access_token = token_response.get('access_token')
             
             if not access_token:
-                print("❌ No access token received")
+                logger.warning("No access token received")
                 self.send_oauth_result_page(None, "No access token received")
                 return
             
-            print(f"✅ Access token received: {access_token[:10]}...")
+            logger.info("Access token received: %s...", access_token[:10])
             
             # Send success page with token
             self.send_oauth_result_page(access_token, None)
             
         except Exception as e:
-            print(f"❌ Error in OAuth callback: {e}")
+            logger.exception("Error in OAuth callback: %s", e)
             self.send_oauth_result_page(None, f"OAuth callback error: {str(e)}")
     
     def send_oauth_result_page(self, access_token, error):
         """Send OAuth result page that communicates with parent window"""
-        self.send_response(200)
-        self.send_header('Content-type', 'text/html')
-        self.add_cors_headers()
-        self.end_headers()
-        
         if access_token:
             result_data = {
                 'type': 'GITHUB_OAUTH_SUCCESS',
@@ -374,89 +2925,756 @@ class OAuthProxyHandler(http.server.SimpleHTTPRequestHandler):
         </html>
         """
         
-        self.wfile.write(html.encode())
+        self.send_response(200)
+        self.send_payload('text/html; charset=utf-8', html.encode())
     
     def handle_api_proxy(self):
-        """Proxy requests to GitHub API"""
+        """Proxy requests to GitHub API
+
+        Any method in API_PROXY_METHODS is forwarded. End-to-end headers go
+        through in both directions (hop-by-hop ones are dropped), and bodies
+        are copied as bytes, so GitHub's errors, Link pagination and rate-limit
+        headers reach the client unchanged.
+        """
         try:
             # Remove /api prefix from path
             api_path = self.path.replace('/api', '', 1)
-            github_url = f'https://api.github.com{api_path}'
+            github_url = f'{GITHUB_API_URL}{api_path}'
             
-            print(f"🔄 Proxying {self.command} request to: {github_url}")
+            logger.debug("Proxying %s request to: %s", self.command, github_url)
             
             # Get authorization header
-            auth_header = self.headers.get('Authorization')
-            
+            auth_header = self.authorization()
             if not auth_header:
-                print("❌ No authorization header")
-                self.send_error_response(401, "Authorization header required")
                 return
             
+            if self.command not in API_PROXY_METHODS:
+                self.send_error_response(405, f"Method {self.command} not supported",
+                                         {'Allow': ', '.join(API_PROXY_METHODS)})
+                return
+            sends_body, cacheable = API_PROXY_METHODS[self.command]
+            
             # Prepare headers for GitHub API
-            headers = {
-                'Authorization': auth_header,
-                'Accept': 'application/vnd.github.v3+json',
-                'User-Agent': 'GitHub-OAuth-Proxy/1.0'
-            }
+            headers = github_headers(auth_header)
+            headers.update(forwarded_request_headers(self.headers))
             
-            # Handle different HTTP methods
-            if self.command == 'GET':
-                request = urllib.request.Request(github_url, headers=headers)
-            elif self.command == 'POST':
-                # Read request body
-                content_length = int(self.headers.get('Content-Length', 0))
-                if content_length > 0:
-                    post_data = self.rfile.read(content_length)
-                else:
-                    post_data = b''
-                
-                headers['Content-Type'] = self.headers.get('Content-Type', 'application/json')
-                request = urllib.request.Request(github_url, data=post_data, headers=headers)
+            if 'chunked' in self.headers.get('Transfer-Encoding', '').lower():
+                self.send_error_response(411, "Request bodies need a Content-Length")
+                return
+            # Read even when it isn't forwarded, so the connection stays in sync
+            body = self.read_body()
+            if sends_body and (body or self.command == 'POST'):
+                headers.setdefault('Content-Type', 'application/json')
             else:
-                self.send_error_response(405, f"Method {self.command} not supported")
+                body = None
+            
+            if self.command == 'GET':
+                try:
+                    api_path, max_pages = pagination_option(api_path)
+                except ValueError as e:
+                    self.send_error_response(400, str(e))
+                    return
+                if max_pages:
+                    self.stream_paginated(api_path, headers, max_pages)
+                    return
+            
+            # Make request to GitHub API over a pooled keep-alive connection
+            if self.command == 'GET' and urllib.parse.urlsplit(api_path).path.endswith(STREAMED_PATH_SUFFIXES):
+                self.stream_upstream(github_url, headers)
                 return
+            elif (self.command == 'GET' and api_path == '/user' and accepts_identity_json(headers.get('Accept'))
+                  and 'X-GitHub-Api-Version' not in headers):
+                # Identity lookups are answered from the identity cache
+                identity = resolve_identity(auth_header)
+                if identity is None:
+                    self.send_error_response(401, "Bad credentials")
+                    return
+                result = identity.user_result
+            elif cacheable:
+                result = fetch_cached(api_path, headers)
+            else:
+                result = fetch_upstream(self.command, github_url, headers, body)
             
-            # Make request to GitHub API
-            try:
-                with urllib.request.urlopen(request) as response:
-                    status_code = response.getcode()
-                    response_data = response.read()
-                    
-                    # Forward the response
-                    self.send_response(status_code)
-                    self.send_header('Content-type', 'application/json')
-                    self.add_cors_headers()
-                    self.end_headers()
-                    self.wfile.write(response_data)
-                    
-                    print(f"✅ API request successful: {status_code}")
-                    
-            except urllib.error.HTTPError as e:
+            if result.status >= 400:
                 # Forward HTTP errors from GitHub API
-                error_data = e.read().decode() if e.fp else "Unknown error"
-                print(f"❌ GitHub API error: {e.code} - {error_data}")
-                
-                self.send_response(e.code)
-                self.send_header('Content-type', 'application/json')
-                self.add_cors_headers()
-                self.end_headers()
-                self.wfile.write(error_data.encode())
+                request_id = next((value for name, value in result.forwarded
+                                   if name.lower() == 'x-github-request-id'), '-')
+                logger.warning("GitHub API error: %s on %s %s (request id %s)",
+                               result.status, self.command, api_path, request_id)
+            else:
+                logger.debug("API request successful: %s", result.status)
+            
+            self.send_upstream_result(result)
                 
+        except RateLimited as e:
+            logger.warning("%s", e)
+            self.send_error_response(429, str(e), {'Retry-After': str(int(e.retry_after) + 1)})
         except Exception as e:
-            print(f"❌ Error in API proxy: {e}")
+            logger.exception("Error in API proxy: %s", e)
             self.send_error_response(500, f"API proxy error: {str(e)}")
     
+    def authorization(self):
+        """The request's Authorization header, or None once 401 has been sent
+
+        Tokens GitHub rejected recently are refused here, without another
+        upstream call.
+        """
+        auth_header = self.headers.get('Authorization')
+        if not auth_header:
+            logger.info("No authorization header on %s", self.path)
+            self.send_error_response(401, "Authorization header required")
+            return None
+        if identity_cache.is_rejected(token_fingerprint(auth_header)):
+            self.send_error_response(401, "Bad credentials")
+            return None
+        return auth_header
+    
+    def handle_auth_check(self):
+        """Answer who a token belongs to and, with ?repo=owner/name, whether it can use that repository
+
+        Served from the identity cache, so a page load validates its token
+        without any upstream call when the token was seen recently.
+        """
+        try:
+            auth_header = self.authorization()
+            if not auth_header:
+                return
+            
+            identity = resolve_identity(auth_header)
+            if identity is None:
+                self.send_error_response(401, "Bad credentials")
+                return
+            response = identity.describe()
+            
+            repo = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query).get('repo', [''])[0]
+            if repo:
+                owner, _, name = repo.partition('/')
+                if not owner or not name or '/' in name:
+                    self.send_error_response(400, "repo must be owner/name")
+                    return
+                response["repo"] = resolve_repo_access(auth_header, identity, owner, name)
+            
+            self.send_response(200)
+            self.send_header('Cache-Control', 'private, no-store')
+            self.send_payload('application/json', json.dumps(response).encode())
+        except RateLimited as e:
+            self.send_error_response(429, str(e), {'Retry-After': str(int(e.retry_after) + 1)})
+        except Exception as e:
+            logger.exception("Error checking token: %s", e)
+            self.send_error_response(502, f"Token check failed: {e}")
+    
+    def handle_batch(self):
+        """Run several GitHub API requests concurrently and return them together
+
+        The body is {"requests": [{"id": ..., "method": "GET", "path": "/user",
+        "etag": ...}, ...]} with paths as they would follow /api. Every request
+        is answered in order with its own status, headers and parsed body, so
+        one failing request doesn't fail the batch.
+        """
+        try:
+            auth_header = self.authorization()
+            if not auth_header:
+                return
+            
+            content_length = int(self.headers.get('Content-Length', 0))
+            if content_length > BATCH_MAX_BODY:
+                self.send_error_response(413, "Batch request body too large")
+                return
+            try:
+                payload = json.loads(self.read_body() or b'null')
+            except ValueError:
+                self.send_error_response(400, "Batch request body must be JSON")
+                return
+            
+            items = payload.get('requests') if isinstance(payload, dict) else None
+            if not isinstance(items, list) or not items:
+                self.send_error_response(400, "Expected {\"requests\": [...]}")
+                return
+            if len(items) > BATCH_MAX_REQUESTS:
+                self.send_error_response(400, f"At most {BATCH_MAX_REQUESTS} requests per batch")
+                return
+            
+            futures = [batch_executor.submit(run_batch_item, item, auth_header) for item in items]
+            responses = [future.result() for future in futures]
+            
+            self.send_response(200)
+            self.send_payload('application/json', json.dumps({"responses": responses}).encode('utf-8'))
+            
+        except Exception as e:
+            logger.exception("Error in batch request: %s", e)
+            self.send_error_response(500, f"Batch error: {str(e)}")
+    
+    def handle_github_webhook(self):
+        """Ingest a GitHub webhook delivery
+
+        Deliveries are checked against the X-Hub-Signature-256 HMAC of
+        GITHUB_WEBHOOK_SECRET before their body is parsed. workflow_run and
+        workflow_job events update the run-state table and wake watchers of
+        the run; they, and issue, comment and pull request events, mark the
+        affected cached responses as changed. Answers 202 with the outcome.
+        """
+        try:
+            if not GITHUB_WEBHOOK_SECRET:
+                self.send_error_response(404, "Webhooks are not enabled")
+                return
+            
+            content_length = int(self.headers.get('Content-Length', 0))
+            if content_length > WEBHOOK_MAX_BODY:
+                self.send_error_response(413, "Webhook payload too large")
+                return
+            body = self.read_body()
+            if not verify_webhook_signature(body, self.headers.get('X-Hub-Signature-256')):
+                logger.warning("Rejected webhook delivery %s with a bad signature",
+                               self.headers.get('X-GitHub-Delivery'))
+                metrics.inc('proxy_webhook_deliveries_total', (('event', 'unknown'), ('outcome', 'unauthorized')))
+                self.send_error_response(401, "Invalid webhook signature")
+                return
+            
+            # Webhooks can be configured to post the payload as a form field
+            if self.headers.get('Content-Type', '').startswith('application/x-www-form-urlencoded'):
+                body = urllib.parse.parse_qs(body.decode('utf-8')).get('payload', [''])[0]
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                self.send_error_response(400, "Webhook payload must be JSON")
+                return
+            
+            event = self.headers.get('X-GitHub-Event', '')
+            outcome = ingest_webhook(event, payload) if isinstance(payload, dict) else 'ignored'
+            logger.info("Webhook %s delivery %s: %s", event, self.headers.get('X-GitHub-Delivery'), outcome)
+            metrics.inc('proxy_webhook_deliveries_total',
+                        (('event', event if event in WEBHOOK_EVENTS else 'other'), ('outcome', outcome)))
+            
+            self.send_response(202)
+            self.send_payload('application/json', json.dumps({"event": event, "outcome": outcome}).encode('utf-8'))
+            
+        except Exception as e:
+            logger.exception("Error ingesting webhook: %s", e)
+            self.send_error_response(500, f"Webhook error: {str(e)}")
+    
+    def handle_dispatch(self):
+        """Dispatch a workflow and answer with the id of the run it started
+
+        Takes the usual dispatch body ({"ref": ..., "inputs": {...}}). Answers
+        200 with the run once it is found, 202 without a run id if it didn't
+        show up within DISPATCH_RESOLVE_TIMEOUT, or GitHub's error if the
+        dispatch itself failed.
+        """
+        try:
+            parsed_path = urllib.parse.urlparse(self.path)
+            match = DISPATCH_PATH.match(parsed_path.path)
+            if not match:
+                self.handle_404()
+                return
+            
+            auth_header = self.authorization()
+            if not auth_header:
+                return
+            
+            content_length = int(self.headers.get('Content-Length', 0))
+            if content_length > DISPATCH_MAX_BODY:
+                self.send_error_response(413, "Dispatch body too large")
+                return
+            try:
+                payload = json.loads(self.read_body() or b'{}')
+            except ValueError:
+                self.send_error_response(400, "Dispatch body must be JSON")
+                return
+            ref = payload.get('ref', 'main') if isinstance(payload, dict) else None
+            inputs = payload.get('inputs') or {} if isinstance(payload, dict) else None
+            if not isinstance(ref, str) or not isinstance(inputs, dict):
+                self.send_error_response(400, "Expected {\"ref\": ..., \"inputs\": {...}}")
+                return
+            
+            owner, repo, workflow_id = match.groups()
+            since = time.time()
+            result, correlation_id = dispatch_resolver.dispatch(owner, repo, workflow_id, ref, inputs, auth_header)
+            if result.status >= 300:
+                logger.warning("Workflow dispatch failed: %s - %s", result.status, result.content[:500].decode(errors='replace'))
+                self.send_upstream_result(result)
+                return
+            
+            run = dispatch_resolver.resolve(owner, repo, workflow_id, ref, since, correlation_id, auth_header)
+            if run is None:
+                response = {"dispatched": True, "run_id": None, "correlation_id": correlation_id}
+                status = 202
+            else:
+                response = dict(run_snapshot(run), dispatched=True, run_id=run['id'], correlation_id=correlation_id)
+                status = 200
+            
+            self.send_response(status)
+            self.send_payload('application/json', json.dumps(response).encode('utf-8'))
+            
+        except RateLimited as e:
+            logger.warning("%s", e)
+            self.send_error_response(429, str(e), {'Retry-After': str(int(e.retry_after) + 1)})
+        except Exception as e:
+            logger.exception("Error in workflow dispatch: %s", e)
+            self.send_error_response(500, f"Dispatch error: {str(e)}")
+    
+    def handle_orchestrate(self):
+        """Start a deployment plan that runs several workflows along a dependency graph
+
+        The body names each step's workflow, its inputs and the steps it
+        needs, e.g. the root deployment as {"ref": "main", "steps":
+        {"networking": {"workflow": "networking.yml", "inputs": {"region":
+        "eastus"}}, "adls": {"workflow": "adls.yml", "needs": ["networking"]},
+        "sql": {"workflow": "sql.yml", "needs": ["networking"]}}}.
+        Independent steps are dispatched concurrently and dependents as soon
+        as their needs succeed. Answers 202 with the plan's progress; follow
+        it at /orchestrate/{id}.
+        """
+        try:
+            match = ORCHESTRATE_PATH.match(urllib.parse.urlparse(self.path).path)
+            if not match:
+                self.handle_404()
+                return
+            
+            auth_header = self.authorization()
+            if not auth_header:
+                return
+            
+            content_length = int(self.headers.get('Content-Length', 0))
+            if content_length > ORCHESTRATE_MAX_BODY:
+                self.send_error_response(413, "Deployment plan too large")
+                return
+            try:
+                ref, plan = parse_orchestration_plan(json.loads(self.read_body() or b'null'))
+            except ValueError as e:
+                self.send_error_response(400, f"Invalid deployment plan: {e}")
+                return
+            
+            # Refuse a plan for a repository the token can't see before dispatching anything
+            owner, repo = match.groups()
+            identity = resolve_identity(auth_header)
+            access = resolve_repo_access(auth_header, identity, owner, repo) if identity else None
+            if access is None or not access["accessible"]:
+                status = access["status"] if access else 401
+                self.send_error_response(status, f"Cannot access repository {owner}/{repo}")
+                return
+            
+            orchestration = orchestrations.start(owner, repo, ref, plan, auth_header)
+            if orchestration is None:
+                self.send_error_response(503, f"Already running {ORCHESTRATE_MAX_ACTIVE} deployment plans",
+                                         {'Retry-After': '30'})
+                return
+            
+            self.send_response(202)
+            self.send_header('Location', f"/orchestrate/{orchestration.id}")
+            self.send_payload('application/json', json.dumps(orchestration.describe()).encode('utf-8'))
+            
+        except RateLimited as e:
+            logger.warning("%s", e)
+            self.send_error_response(429, str(e), {'Retry-After': str(int(e.retry_after) + 1)})
+        except Exception as e:
+            logger.exception("Error starting orchestration: %s", e)
+            self.send_error_response(500, f"Orchestration error: {str(e)}")
+    
+    def handle_orchestration_status(self):
+        """Aggregated progress of a deployment plan started with /orchestrate
+
+        With ?since={version} it long-polls, answering as soon as the plan
+        moves past that version.
+        """
+        try:
+            parsed_path = urllib.parse.urlparse(self.path)
+            match = ORCHESTRATION_PATH.match(parsed_path.path)
+            if not match:
+                self.handle_404()
+                return
+            
+            auth_header = self.authorization()
+            if not auth_header:
+                return
+            
+            orchestration = orchestrations.get(match.group(1), auth_header)
+            if orchestration is None:
+                self.send_error_response(404, "No such orchestration")
+                return
+            
+            since = urllib.parse.parse_qs(parsed_path.query).get('since', [None])[0]
+            if since is not None and run_watchers.try_hold():
+                try:
+                    orchestration.wait_for_change(int(since), WATCH_LONG_POLL_TIMEOUT)
+                finally:
+                    run_watchers.release_hold()
+            
+            self.send_response(200)
+            self.send_header('Cache-Control', 'no-store')
+            self.send_payload('application/json', json.dumps(orchestration.describe()).encode('utf-8'))
+            
+        except ValueError:
+            self.send_error_response(400, "since must be a version number")
+        except Exception as e:
+            logger.exception("Error reading orchestration: %s", e)
+            self.send_error_response(500, f"Orchestration error: {str(e)}")
+    
+    def handle_workflow_status(self):
+        """Latest runs (and optionally artifacts) of a workflow in one trimmed response
+
+        /status/repos/{owner}/{repo}/workflows/{workflow_id}?per_page=10&artifacts=1
+        lists the newest runs with only the fields the UI uses, adding the
+        artifacts of the newest ``artifacts`` completed runs.
+        """
+        try:
+            parsed_path = urllib.parse.urlparse(self.path)
+            match = STATUS_PATH.match(parsed_path.path)
+            if not match:
+                self.handle_404()
+                return
+            
+            auth_header = self.authorization()
+            if not auth_header:
+                return
+            
+            query_params = urllib.parse.parse_qs(parsed_path.query)
+            try:
+                per_page = int(query_params.get('per_page', ['10'])[0])
+                artifact_runs = int(query_params.get('artifacts', ['0'])[0])
+            except ValueError:
+                self.send_error_response(400, "per_page and artifacts must be numbers")
+                return
+            
+            owner, repo, workflow_id = (urllib.parse.unquote(part) for part in match.groups())
+            result = workflow_status(owner, repo, workflow_id, github_headers(auth_header),
+                                     per_page=min(max(per_page, 1), STATUS_MAX_RUNS),
+                                     artifact_runs=min(max(artifact_runs, 0), STATUS_MAX_ARTIFACT_RUNS))
+            self.send_upstream_result(result)
+            
+        except RateLimited as e:
+            logger.warning("%s", e)
+            self.send_error_response(429, str(e), {'Retry-After': str(int(e.retry_after) + 1)})
+        except Exception as e:
+            logger.exception("Error in workflow status: %s", e)
+            self.send_error_response(500, f"Workflow status error: {str(e)}")
+    
+    def handle_artifact_file(self):
+        """Serve one file extracted from a workflow artifact
+
+        /artifacts/repos/{owner}/{repo}/{artifact_id}?file=name returns
+        {"artifact_id", "file", "files", "content"}; without ?file the first
+        JSON file (or else text file) in the artifact is chosen.
+        """
+        try:
+            parsed_path = urllib.parse.urlparse(self.path)
+            match = ARTIFACT_FILE_PATH.match(parsed_path.path)
+            if not match:
+                self.handle_404()
+                return
+            
+            auth_header = self.authorization()
+            if not auth_header:
+                return
+            
+            owner, repo, artifact_id = match.groups()
+            requested = urllib.parse.parse_qs(parsed_path.query).get('file', [None])[0]
+            result = extract_artifact_file(owner, repo, artifact_id, requested, auth_header)
+            self.send_upstream_result(result)
+            
+        except RateLimited as e:
+            logger.warning("%s", e)
+            self.send_error_response(429, str(e), {'Retry-After': str(int(e.retry_after) + 1)})
+        except Exception as e:
+            logger.exception("Error extracting artifact: %s", e)
+            self.send_error_response(500, f"Artifact extraction error: {str(e)}")
+    
+    def handle_watch_run(self):
+        """Push status changes of a workflow run to the client
+
+        /watch/repos/{owner}/{repo}/runs/{run_id} streams Server-Sent Events
+        until the run completes. With ?mode=poll&since={version} it long-polls
+        instead, returning as soon as the run state moves past the given
+        version. Either way every watcher of a run shares one upstream poll
+        loop.
+        """
+        try:
+            parsed_path = urllib.parse.urlparse(self.path)
+            match = WATCH_PATH.match(parsed_path.path)
+            if not match:
+                self.handle_404()
+                return
+            
+            auth_header = self.authorization()
+            if not auth_header:
+                return
+            
+            owner, repo, run_id = match.groups()
+            api_path = f'/repos/{owner}/{repo}/actions/runs/{run_id}'
+            key = (owner.lower(), repo.lower(), int(run_id))
+            
+            # A token joins a live watcher without an upstream call only if it
+            # has already been allowed to read the run
+            watcher = run_watchers.get(key)
+            run = None
+            if watcher is None or token_fingerprint(auth_header) not in watcher.authorized:
+                result = fetch_cached(api_path, github_headers(auth_header))
+                if result.status != 200:
+                    self.send_upstream_result(result)
+                    return
+                run = json.loads(result.content)
+            
+            query_params = urllib.parse.parse_qs(parsed_path.query)
+            watcher = run_watchers.attach(key, api_path, auth_header, run)
+            held = run_watchers.try_hold()
+            try:
+                if query_params.get('mode', [None])[0] == 'poll' or not held:
+                    since = int(query_params.get('since', ['-1'])[0])
+                    self.long_poll_run(watcher, since, WATCH_LONG_POLL_TIMEOUT if held else 0)
+                else:
+                    self.stream_run_events(watcher)
+            finally:
+                if held:
+                    run_watchers.release_hold()
+                watcher.unsubscribe(auth_header)
+        
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+        except RateLimited as e:
+            self.send_error_response(429, str(e), {'Retry-After': str(int(e.retry_after) + 1)})
+        except Exception as e:
+            logger.exception("Error in run watcher: %s", e)
+            self.send_error_response(500, f"Run watcher error: {str(e)}")
+    
+    def long_poll_run(self, watcher, since, timeout):
+        """Answer with the run state once it is newer than since, or after timeout"""
+        version, snapshot, error = watcher.wait_for_change(since, timeout)
+        body = json.dumps({
+            "version": version,
+            "run": snapshot,
+            "completed": bool(snapshot and snapshot.get('status') == 'completed'),
+            "error": error
+        }).encode()
+        self.send_response(200)
+        self.send_header('Cache-Control', 'no-store')
+        self.send_payload('application/json', body)
+    
+    def stream_run_events(self, watcher):
+        """Send the run state as Server-Sent Events until it completes"""
+        self.send_response(200)
+        self.send_header('Content-type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-store')
+        self.send_header('X-Accel-Buffering', 'no')
+        self.start_body_stream()
+        self.add_cors_headers()
+        self.end_headers()
+        
+        version = 0
+        deadline = time.monotonic() + WATCH_MAX_DURATION
+        while time.monotonic() < deadline:
+            new_version, snapshot, error = watcher.wait_for_change(version, WATCH_HEARTBEAT_INTERVAL)
+            if error:
+                self.write_body_chunk(f"event: error\ndata: {json.dumps({'error': error})}\n\n".encode())
+                break
+            if new_version > version:
+                version = new_version
+                self.write_body_chunk(f"id: {version}\nevent: status\ndata: {json.dumps(snapshot)}\n\n".encode())
+                if snapshot.get('status') == 'completed':
+                    break
+            elif watcher.finished:
+                break
+            else:
+                self.write_body_chunk(b": keep-alive\n\n")
+        self.end_body_stream()
+    
+    def stream_upstream(self, github_url, headers):
+        """Relay a GitHub response to the client in fixed-size chunks without buffering it"""
+        with open_github(self.command, github_url, headers) as response:
+            logger.info("Streaming %s response from: %s", response.status, github_url)
+            content_type = response.getheader('Content-Type', 'application/octet-stream')
+            content_length = response.getheader('Content-Length')
+            self.send_response(response.status)
+            self.send_header('Content-type', content_type)
+            for name in STREAMED_HEADERS:
+                if response.getheader(name):
+                    self.send_header(name, response.getheader(name))
+            
+            # Text such as job logs is gzipped on the fly; zips go through untouched
+            compressor = None
+            if is_compressible(content_type, int(content_length) if content_length else None):
+                self.send_header('Vary', 'Accept-Encoding')
+                if accepts_gzip(self.headers.get('Accept-Encoding')):
+                    compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+                    self.send_header('Content-Encoding', 'gzip')
+                    content_length = None
+            self.start_body_stream(content_length)
+            self.add_cors_headers()
+            self.end_headers()
+            
+            try:
+                while True:
+                    chunk = response.read(STREAM_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    self.write_body_chunk(compressor.compress(chunk) if compressor else chunk)
+                if compressor:
+                    self.write_body_chunk(compressor.flush())
+                self.end_body_stream()
+            except (BrokenPipeError, ConnectionResetError):
+                # The client went away; the unread upstream connection is discarded on close
+                logger.info("Client disconnected while streaming: %s", github_url)
+                self.close_connection = True
+            except Exception as e:
+                # The status is already sent: cut the body short so the client sees an incomplete response
+                logger.warning("Streaming %s stopped early: %s", github_url, e)
+                self.close_connection = True
+    
+    def stream_paginated(self, api_path, headers, max_pages):
+        """Follow rel="next" server-side and stream every page's items as one JSON list
+
+        The merged response keeps the shape of a single page: an array, or
+        the first page's object with the items of all pages in its array.
+        If max_pages stops it before the last page, and the last page is
+        known, the response carries a Link to the proxy path that merges the
+        pages left out.
+        """
+        first = fetch_cached(api_path, headers)
+        if first.status != 200 or 'next' not in link_relations(first.forwarded):
+            self.send_upstream_result(first)
+            return
+        try:
+            _, key = page_items(first)
+        except ValueError:
+            self.send_upstream_result(first)
+            return
+        _, left_out = plan_pages(first, max_pages)
+        
+        self.send_response(200)
+        self.send_header('Content-type', 'application/json; charset=utf-8')
+        if left_out:
+            self.send_header('Link', f'<{proxy_page_link(left_out, max_pages)}>; rel="next"')
+        self.send_header('Vary', 'Accept-Encoding')
+        compressor = None
+        if accepts_gzip(self.headers.get('Accept-Encoding')):
+            compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self.send_header('Content-Encoding', 'gzip')
+        self.start_body_stream()
+        self.add_cors_headers()
+        self.end_headers()
+        
+        def write(text, final=False):
+            data = text.encode('utf-8')
+            if compressor:
+                # Flush per page so the client can parse as pages arrive
+                data = compressor.compress(data) + compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+            self.write_body_chunk(data)
+        
+        if key is None:
+            write('[')
+        else:
+            envelope = json.dumps({name: value for name, value in json.loads(first.content).items() if name != key})
+            write(envelope[:-1] + (', ' if len(envelope) > 2 else '') + json.dumps(key) + ': [')
+        pages = items = 0
+        try:
+            for page in paginated_results(first, headers, max_pages):
+                page_list, _ = page_items(page)
+                if page_list:
+                    write((', ' if items else '') + json.dumps(page_list)[1:-1])
+                pages += 1
+                items += len(page_list)
+            write(']' if key is None else ']}', final=True)
+            self.end_body_stream()
+            logger.debug("Merged %d items from %d pages of %s", items, pages, api_path)
+        except (BrokenPipeError, ConnectionResetError):
+            logger.info("Client disconnected while paginating: %s", api_path)
+            self.close_connection = True
+        except Exception as e:
+            # The status is already sent: cut the body short so the client sees an incomplete response
+            logger.warning("Pagination of %s stopped after %d pages: %s", api_path, pages, e)
+            self.close_connection = True
+    
+    def start_body_stream(self, content_length=None):
+        """Send the framing header for a body that is written incrementally
+
+        Uses Content-Length when the size is known, chunked transfer encoding
+        when the connection speaks HTTP/1.1, and otherwise delimits the body by
+        closing the connection.
+        """
+        self.chunked_response = False
+        if content_length is not None:
+            self.send_header('Content-Length', str(content_length))
+        elif self.protocol_version >= 'HTTP/1.1' and self.request_version >= 'HTTP/1.1':
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.chunked_response = True
+        else:
+            self.close_connection = True
+    
+    def write_body_chunk(self, data):
+        """Write part of a body started with start_body_stream"""
+        if not data:
+            return
+        if self.chunked_response:
+            self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+        else:
+            self.wfile.write(data)
+        self.wfile.flush()
+    
+    def end_body_stream(self):
+        """Finish a body started with start_body_stream"""
+        if self.chunked_response:
+            self.wfile.write(b'0\r\n\r\n')
+            self.wfile.flush()
+            self.chunked_response = False
+    
+    def send_upstream_result(self, result):
+        """Forward a buffered GitHub response, answering 304 if the browser's copy is current"""
+        client_etag = self.headers.get('If-None-Match')
+        if result.status == 200 and result.etag and client_etag == result.etag:
+            self.send_response(304)
+            self.send_header('ETag', result.etag)
+            self.send_header('Cache-Control', 'private, no-cache')
+            for name, value in result.forwarded:
+                self.send_header(name, value)
+            self.add_cors_headers()
+            self.end_headers()
+            return
+        
+        content_type = result.headers.get('Content-Type', 'application/json')
+        body, content_encoding = result.encoded(accepts_gzip(self.headers.get('Accept-Encoding')))
+        self.send_response(result.status)
+        self.send_header('Content-type', content_type)
+        if result.etag:
+            self.send_header('ETag', result.etag)
+            # Let the browser keep a copy but revalidate it on every poll
+            self.send_header('Cache-Control', 'private, no-cache')
+        if result.last_modified:
+            self.send_header('Last-Modified', result.last_modified)
+        if result.content_encoding or is_compressible(content_type, len(result.body)):
+            self.send_header('Vary', 'Accept-Encoding')
+        if content_encoding:
+            self.send_header('Content-Encoding', content_encoding)
+        for name, value in result.forwarded:
+            self.send_header(name, value)
+        # 204 and 304 responses have no body, and may not describe one
+        if result.status not in (204, 304):
+            self.send_header('Content-Length', str(len(body)))
+        self.add_cors_headers()
+        self.end_headers()
+        if self.command != 'HEAD' and result.status not in (204, 304):
+            self.wfile.write(body)
+    
+    def send_payload(self, content_type, body):
+        """Finish the headers and send a complete body, gzipped if the client accepts it and it is worth it"""
+        self.send_header('Content-type', content_type)
+        if is_compressible(content_type, len(body)):
+            self.send_header('Vary', 'Accept-Encoding')
+            if accepts_gzip(self.headers.get('Accept-Encoding')):
+                body = gzip.compress(body, COMPRESS_LEVEL)
+                self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.add_cors_headers()
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+    
     def handle_404(self):
         """Handle 404 errors"""
         self.send_error_response(404, "Endpoint not found")
     
-    def send_error_response(self, status_code, message):
+    def send_error_response(self, status_code, message, extra_headers=None):
         """Send JSON error response"""
         self.send_response(status_code)
-        self.send_header('Content-type', 'application/json')
-        self.add_cors_headers()
-        self.end_headers()
+        for name, value in (extra_headers or {}).items():
+            self.send_header(name, value)
         
         error_response = {
             "error": True,
@@ -465,7 +3683,7 @@ class OAuthProxyHandler(http.server.SimpleHTTPRequestHandler):
             "timestamp": datetime.now().isoformat()
         }
         
-        self.wfile.write(json.dumps(error_response).encode())
+        self.send_payload('application/json', json.dumps(error_response).encode())
     
     def get_base_url(self):
         """Get the base URL of the server"""
@@ -480,24 +3698,227 @@ class OAuthProxyHandler(http.server.SimpleHTTPRequestHandler):
         else:
             return f'http://{host}'
     
+    def log_request(self, code='-', size='-'):
+        """Write a structured access log line"""
+        if isinstance(code, http.HTTPStatus):
+            code = code.value
+        access_logger.info('"%s" %s', self.requestline, code, extra={
+            'fields': {
+                "method": self.command,
+                "path": self.path,
+                "status": code,
+                "client": self.client_address[0]
+            },
+            **(SAMPLED if self.command == 'OPTIONS' else {})
+        })
+    
+    def log_error(self, format, *args):
+        access_logger.warning(format, *args)
+    
     def log_message(self, format, *args):
-        """Override log message to add timestamp"""
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        print(f"[{timestamp}] {format % args}")
+        """Route BaseHTTPRequestHandler's own messages to the logger"""
+        access_logger.info(format, *args)
+
+class ThreadPoolHTTPServer(socketserver.TCPServer):
+    """TCP server that hands accepted connections to a bounded pool of worker threads
+
+    Accepted connections wait in a bounded queue for a free worker. When the
+    queue is full the connection is answered with a 503 straight away, so a
+    burst of slow upstream calls degrades into fast rejections instead of an
+    ever-growing backlog.
+
+    Pre-forked worker processes pass the listening socket they inherited as
+    listen_socket instead of binding their own.
+    """
+    allow_reuse_address = True
+    request_queue_size = 128  # listen() backlog
+    stopping = False
+
+    def __init__(self, server_address, handler_class, workers=WORKER_THREADS,
+                 queue_size=REQUEST_QUEUE_SIZE, listen_socket=None):
+        super().__init__(server_address, handler_class, bind_and_activate=listen_socket is None)
+        if listen_socket is not None:
+            self.socket.close()
+            self.socket = listen_socket
+            self.server_address = listen_socket.getsockname()
+        self.workers = workers
+        self.pending = queue.Queue(maxsize=queue_size)
+        metrics.collectors.append(lambda: [('gauge', 'proxy_request_queue_depth', (), self.pending.qsize())])
+        self.threads = []
+        for index in range(workers):
+            thread = threading.Thread(target=self.worker_loop, name=f"proxy-worker-{index}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def process_request(self, request, client_address):
+        """Queue the connection for a worker, or reject it if the queue is full"""
+        try:
+            self.pending.put_nowait((request, client_address))
+        except queue.Full:
+            logger.warning("Request queue full, rejecting connection from %s", client_address[0])
+            metrics.inc('proxy_requests_rejected_total')
+            self.reject_request(request)
+
+    def reject_request(self, request):
+        """Answer a connection with 503 without handing it to a worker"""
+        body = json.dumps({
+            "error": True,
+            "status": 503,
+            "message": "Server busy, please retry",
+            "timestamp": datetime.now().isoformat()
+        }).encode()
+        head = (
+            "HTTP/1.0 503 Service Unavailable\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Retry-After: 1\r\n"
+            "Access-Control-Allow-Origin: *\r\n"
+            "Connection: close\r\n\r\n"
+        ).encode()
+        try:
+            request.settimeout(1)
+            request.sendall(head + body)
+        except OSError:
+            pass
+        self.shutdown_request(request)
+
+    def worker_loop(self):
+        """Serve queued connections until a None sentinel is received"""
+        while True:
+            item = self.pending.get()
+            if item is None:
+                break
+            request, client_address = item
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    def get_request(self):
+        """Accept a connection; on a socket shared with other processes another one may win it"""
+        request, client_address = self.socket.accept()
+        # The shared socket is non-blocking, the connection must not be
+        request.setblocking(True)
+        return request, client_address
+
+    def server_close(self, timeout=SHUTDOWN_TIMEOUT):
+        """Close the listening socket and stop the worker threads once the queued connections are served"""
+        self.stopping = True
+        super().server_close()
+        for _ in self.threads:
+            self.pending.put(None)
+        deadline = time.monotonic() + timeout
+        for thread in self.threads:
+            thread.join(timeout=max(0, deadline - time.monotonic()))
+
+def serve(listen_socket=None):
+    """Serve requests in this process until SIGTERM, then drain in-flight requests"""
+    with ThreadPoolHTTPServer(("", PORT), OAuthProxyHandler, listen_socket=listen_socket) as httpd:
+        def drain(signum, frame):
+            logger.info("Received signal %s, finishing in-flight requests", signum)
+            # shutdown() waits for serve_forever(), which this handler interrupted
+            threading.Thread(target=httpd.shutdown, daemon=True).start()
+        
+        signal.signal(signal.SIGTERM, drain)
+        httpd.serve_forever()
+
+class WorkerSupervisor:
+    """Pre-fork supervisor: worker processes share one listening socket
+
+    The supervisor binds the socket and forks the workers while it runs no
+    other thread: its log writer is stopped, with its queue drained, around
+    each fork, so no lock is copied held. The kernel hands each connection
+    to one of the workers blocked in accept(), so throughput scales with the
+    processes rather than being capped by one interpreter lock. Workers that
+    die are replaced. SIGTERM or SIGINT is passed on to the workers, which
+    stop accepting and finish their in-flight requests; any still running
+    after SHUTDOWN_TIMEOUT are killed.
+    """
+
+    def __init__(self, processes, listen_socket):
+        self.processes = processes
+        self.socket = listen_socket
+        self.workers = {}  # pid -> start time
+        self.stopping_at = None
+
+    def spawn(self):
+        """Fork a worker process"""
+        log_listener.stop()
+        pid = os.fork()
+        # Both processes restart the log writer on their own copy of the queue
+        log_listener.start()
+        if pid:
+            self.workers[pid] = time.monotonic()
+            return
+        
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        code = 0
+        try:
+            serve(self.socket)
+        except Exception as e:
+            logger.exception("Worker error: %s", e)
+            code = 1
+        finally:
+            log_listener.stop()
+            os._exit(code)
+
+    def stop(self, signum, frame):
+        """Start a graceful shutdown of all workers"""
+        if self.stopping_at is None:
+            logger.info("Received signal %s, draining %d workers", signum, len(self.workers))
+            self.stopping_at = time.monotonic()
+            for pid in self.workers:
+                os.kill(pid, signal.SIGTERM)
+
+    def run(self):
+        """Start the workers and keep them running until told to stop"""
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for _ in range(self.processes):
+            self.spawn()
+        logger.info("GitHub OAuth Proxy Server running on port %s with %d worker processes "
+                    "(health check: http://localhost:%s/health)", PORT, self.processes, PORT)
+        
+        while self.workers:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if not pid:
+                if self.stopping_at is not None and time.monotonic() - self.stopping_at > SHUTDOWN_TIMEOUT + 5:
+                    logger.warning("Killing %d workers that did not drain in time", len(self.workers))
+                    for pid in self.workers:
+                        os.kill(pid, signal.SIGKILL)
+                time.sleep(0.2)
+                continue
+            
+            started = self.workers.pop(pid, None)
+            if started is None or self.stopping_at is not None:
+                continue
+            logger.error("Worker %s exited with status %s, starting a replacement",
+                         pid, os.waitstatus_to_exitcode(status))
+            if time.monotonic() - started < WORKER_MIN_UPTIME:
+                time.sleep(WORKER_RESTART_DELAY)
+            self.spawn()
+        logger.info("All workers stopped")
 
 def main():
     """Main function to start the server"""
     try:
-        with socketserver.TCPServer(("", PORT), OAuthProxyHandler) as httpd:
-            print(f"🌟 GitHub OAuth Proxy Server running on port {PORT}")
-            print(f"🔗 Health check: http://localhost:{PORT}/health")
-            print(f"🔐 OAuth authorize: http://localhost:{PORT}/oauth/authorize")
-            print("🛑 Press Ctrl+C to stop the server")
-            httpd.serve_forever()
+        if WORKER_PROCESSES > 1 and hasattr(os, 'fork'):
+            listen_socket = socket.create_server(("", PORT), backlog=ThreadPoolHTTPServer.request_queue_size)
+            # Workers all wait on this socket: a worker woken for a connection
+            # another one accepted must not block in accept()
+            listen_socket.setblocking(False)
+            WorkerSupervisor(WORKER_PROCESSES, listen_socket).run()
+        else:
+            logger.info("GitHub OAuth Proxy Server running on port %s "
+                        "(health check: http://localhost:%s/health)", PORT, PORT)
+            serve()
     except KeyboardInterrupt:
-        print("\n👋 Server stopped by user")
+        logger.info("Server stopped by user")
     except Exception as e:
-        print(f"❌ Server error: {e}")
+        logger.exception("Server error: %s", e)
 
 if __name__ == "__main__":
     main()
@@ -9,14 +9,19 @@ Usage:
     python oauth-proxy-server.py
 
 The server will run on http://localhost:8000
+
+GITHUB_API_URL and GITHUB_URL may be set to point the proxy at another
+GitHub endpoint (default: https://api.github.com and https://github.com).
 """
 
 import os
 import json
 import urllib.parse
-import urllib.request
+import http.client
 import http.server
 import socketserver
+import threading
+import time
 from datetime import datetime
 import secrets
 import base64
@@ -26,6 +31,10 @@ PORT = 8000
 GITHUB_CLIENT_ID = ""  # Your GitHub OAuth App Client ID
 GITHUB_CLIENT_SECRET = ""  # You'll need to set this - see instructions below
 
+# GitHub endpoints (override to point the proxy at a stand-in, e.g. for benchmarks)
+GITHUB_API_URL = os.environ.get('GITHUB_API_URL', 'https://api.github.com').rstrip('/')
+GITHUB_URL = os.environ.get('GITHUB_URL', 'https://github.com').rstrip('/')
+
 # Instructions for setting up GitHub OAuth App:
 # 1. Go to https://github.com/settings/applications/new
 # 2. Application name: "Workflow Trigger App"
@@ -36,6 +45,77 @@ GITHUB_CLIENT_SECRET = ""  # You'll need to set this - see instructions below
 # 7. Generate a new client secret and set GITHUB_CLIENT_SECRET below
 # 8. For production, use environment variables instead of hardcoding
 
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')
+
+class GitHubConnectionPool:
+    """Keeps one keep-alive connection per GitHub host and thread
+
+    Connections idle for longer than idle_timeout are replaced. A request that
+    fails on a reused connection is retried once on a fresh one, unless it was
+    a POST or PATCH that had already been sent. Redirects are followed, without
+    the Authorization header when they lead to another host.
+    """
+    def __init__(self, idle_timeout=60, timeout=30, max_redirects=5):
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.max_redirects = max_redirects
+        self.local = threading.local()
+    
+    def request(self, method, url, body=None, headers=None):
+        """Send a request, following redirects, and return (status, body bytes)"""
+        headers = dict(headers or {})
+        for _ in range(self.max_redirects + 1):
+            status, location, data = self.send(method, url, body, headers)
+            if status not in REDIRECT_CODES or not location:
+                return status, data
+            next_url = urllib.parse.urljoin(url, location)
+            if urllib.parse.urlsplit(next_url).netloc != urllib.parse.urlsplit(url).netloc:
+                headers.pop('Authorization', None)
+            if status == 303 or (status in (301, 302) and method == 'POST'):
+                method, body = 'GET', None
+                headers.pop('Content-Type', None)
+            url = next_url
+        raise http.client.HTTPException(f"Too many redirects for {url}")
+    
+    def send(self, method, url, body, headers):
+        """Send one request and return (status, Location header, body bytes)"""
+        parts = urllib.parse.urlsplit(url)
+        target = parts.path + (f'?{parts.query}' if parts.query else '')
+        connections = self.local.__dict__.setdefault('connections', {})
+        
+        for attempt in range(2):
+            connection, last_used = connections.pop((parts.scheme, parts.netloc), (None, 0))
+            reused = connection is not None and time.monotonic() - last_used < self.idle_timeout
+            if not reused:
+                if connection is not None:
+                    connection.close()
+                connection_class = (http.client.HTTPSConnection if parts.scheme == 'https'
+                                    else http.client.HTTPConnection)
+                connection = connection_class(parts.netloc, timeout=self.timeout)
+            sent = False
+            try:
+                connection.request(method, target, body=body, headers=headers)
+                sent = True
+                response = connection.getresponse()
+                data = response.read()
+            except (ConnectionResetError, BrokenPipeError, http.client.BadStatusLine):
+                connection.close()
+                # GitHub may already have acted on a POST it never answered
+                if reused and attempt == 0 and (not sent or method in IDEMPOTENT_METHODS):
+                    continue
+                raise
+            except Exception:
+                connection.close()
+                raise
+            if response.will_close:
+                connection.close()
+            else:
+                connections[(parts.scheme, parts.netloc)] = (connection, time.monotonic())
+            return response.status, response.getheader('Location'), data
+
+github_pool = GitHubConnectionPool()
+
 class OAuthProxyHandler(http.server.SimpleHTTPRequestHandler):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, directory="docs", **kwargs)
@@ -80,7 +160,7 @@ class OAuthProxyHandler(http.server.SimpleHTTPRequestHandler):
                 'state': state
             }
             
-            github_url = 'https://github.com/login/oauth/authorize?' + urllib.parse.urlencode(params)
+            github_url = f'{GITHUB_URL}/login/oauth/authorize?' + urllib.parse.urlencode(params)
             
             # Send redirect response
             self.send_response(302)
@@ -198,18 +278,18 @@ class OAuthProxyHandler(http.server.SimpleHTTPRequestHandler):
         
         # Make request to GitHub
         req_data = urllib.parse.urlencode(token_data).encode('utf-8')
-        req = urllib.request.Request(
-            'https://github.com/login/oauth/access_token',
-            data=req_data,
+        status, body = github_pool.request(
+            'POST',
+            f'{GITHUB_URL}/login/oauth/access_token',
+            body=req_data,
             headers={
                 'Accept': 'application/json',
                 'Content-Type': 'application/x-www-form-urlencoded'
             }
         )
         
-        with urllib.request.urlopen(req) as response:
-            response_data = json.loads(response.read().decode('utf-8'))
-            return response_data
+        response_data = json.loads(body.decode('utf-8'))
+        return response_data
     
     def handle_api_proxy(self):
         """Proxy API requests to GitHub with CORS headers"""
@@ -222,7 +302,7 @@ class OAuthProxyHandler(http.server.SimpleHTTPRequestHandler):
             
             # Extract the GitHub API path
             api_path = self.path[4:]  # Remove '/api' prefix
-            github_url = f"https://api.github.com{api_path}"
+            github_url = f"{GITHUB_API_URL}{api_path}"
             
             # Prepare headers for GitHub API
             headers = {
@@ -233,40 +313,36 @@ class OAuthProxyHandler(http.server.SimpleHTTPRequestHandler):
             
             # Handle different HTTP methods
             if self.command == 'GET':
-                req = urllib.request.Request(github_url, headers=headers)
+                body = None
             elif self.command == 'POST':
                 # Read request body
                 content_length = int(self.headers.get('Content-Length', 0))
                 body = self.rfile.read(content_length) if content_length > 0 else b''
                 
                 headers['Content-Type'] = self.headers.get('Content-Type', 'application/json')
-                req = urllib.request.Request(github_url, data=body, headers=headers)
             else:
                 self.send_error_response(405, f"Method {self.command} not allowed")
                 return
             
-            # Make request to GitHub API
-            try:
-                with urllib.request.urlopen(req) as response:
-                    response_data = response.read()
-                    
-                    # Send successful response with CORS headers
-                    self.send_response(response.status)
-                    self.send_header('Content-Type', 'application/json')
-                    self.send_header('Access-Control-Allow-Origin', '*')
-                    self.send_header('Access-Control-Allow-Methods', 'GET, POST, PUT, DELETE, OPTIONS')
-                    self.send_header('Access-Control-Allow-Headers', 'Content-Type, Authorization')
-                    self.end_headers()
-                    self.wfile.write(response_data)
-                    
-            except urllib.error.HTTPError as e:
+            # Make request to GitHub API over a keep-alive connection
+            status, response_data = github_pool.request(self.command, github_url, body=body, headers=headers)
+            
+            if status < 400:
+                # Send successful response with CORS headers
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Access-Control-Allow-Origin', '*')
+                self.send_header('Access-Control-Allow-Methods', 'GET, POST, PUT, DELETE, OPTIONS')
+                self.send_header('Access-Control-Allow-Headers', 'Content-Type, Authorization')
+                self.end_headers()
+                self.wfile.write(response_data)
+            else:
                 # Forward HTTP errors from GitHub API
-                error_data = e.read()
-                self.send_response(e.code)
+                self.send_response(status)
                 self.send_header('Content-Type', 'application/json')
                 self.send_header('Access-Control-Allow-Origin', '*')
                 self.end_headers()
-                self.wfile.write(error_data)
+                self.wfile.write(response_data)
                 
         except Exception as e:
             self.log_error(f"API proxy error: {e}")